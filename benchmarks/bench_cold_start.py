@@ -0,0 +1,67 @@
+"""
+Cold-start benchmark: time from process start to the first served request.
+
+Each run starts a fresh interpreter that imports the app, creates it against an already
+seeded SQLite file and serves one request, as a machine waking from auto-stop does.
+
+    uv run python -m benchmarks.bench_cold_start --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Runs in the child process; prints once the first response has been served
+CHILD = """
+from base64 import b64encode
+from lms_backend.app import create_app
+from lms_backend.app.config import Config
+
+app = create_app(Config)
+credentials = b64encode(f"{Config.DEMO_USER_NAME}:{Config.DEMO_USER_PASS}".encode())
+response = app.test_client().get(
+    "/auth/users", headers={"Authorization": f"Basic {credentials.decode()}"}
+)
+assert response.status_code == 200, response.status_code
+print("served", flush=True)
+"""
+
+
+def cold_start(env: dict) -> float:
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, check=True, stdout=subprocess.DEVNULL
+    )
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = {
+            **os.environ,
+            "DATABASE_URI": f"sqlite:///{os.path.join(tmpdir, 'lms.db')}",
+        }
+        # First boot creates the schema and seed data
+        first = cold_start({**env, "BOOTSTRAP_MODE": "full"})
+        print(f"{'first boot':>10}: {first * 1000:8.1f} ms")
+
+        for mode in ("full", "auto", "skip"):
+            timings = [
+                cold_start({**env, "BOOTSTRAP_MODE": mode}) for _ in range(args.runs)
+            ]
+            print(
+                f"{mode:>10}: {statistics.median(timings) * 1000:8.1f} ms median, "
+                f"{min(timings) * 1000:8.1f} ms best of {args.runs}"
+            )
+
+
+if __name__ == "__main__":
+    main()
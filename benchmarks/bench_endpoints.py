@@ -0,0 +1,232 @@
+"""
+Endpoint benchmark: throughput and latency percentiles of the main API routes.
+
+Serves the app on a local threaded WSGI server, backed by a seeded SQLite file and the
+in-process Siyavula stub, and drives each scenario at the given concurrency.
+
+    uv run python -m benchmarks.bench_endpoints --concurrency 16 --requests 500
+    uv run python -m benchmarks.bench_endpoints --scenario create-activity --latency 100
+    uv run python -m benchmarks.bench_endpoints --cassette siyavula_cassette.jsonl
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+from sqlalchemy import insert
+from werkzeug.serving import make_server
+
+from benchmarks.siyavula_stub import SiyavulaStub
+from lms_backend.app import create_app
+from lms_backend.app.config import Config
+from lms_backend.app.db import db
+from lms_backend.app.models import Course, User
+
+# A scenario returns the method, path and JSON body of its n-th request
+Scenario = Callable[[int], Tuple[str, str, Dict]]
+
+
+def scenarios(users: int, courses: int) -> Dict[str, Scenario]:
+    activity = {"activity_uuid": str(uuid.uuid4()), "response_uuid": str(uuid.uuid4())}
+    # Every (user, course) pair once, so assignments are created rather than rejected
+    pairs = list(itertools.product(range(1, users + 1), range(1, courses + 1)))
+
+    def user_id(n):
+        return n % users + 1
+
+    return {
+        "list-users": lambda n: ("GET", "/auth/users?limit=100", None),
+        "create-assignment": lambda n: (
+            "POST",
+            "/assignments",
+            dict(zip(("user_id", "course_id"), pairs[n % len(pairs)])),
+        ),
+        "create-activity": lambda n: (
+            "POST",
+            "/siyavula/activity",
+            {"user_id": user_id(n), "section_id": 1},
+        ),
+        "submit-answer": lambda n: (
+            "POST",
+            "/siyavula/activity/answer",
+            {"user_id": user_id(n), "answers": {"0": "42"}, **activity},
+        ),
+        "next-question": lambda n: (
+            "POST",
+            "/siyavula/activity/next",
+            {"user_id": user_id(n), **activity},
+        ),
+        "retry": lambda n: (
+            "POST",
+            "/siyavula/activity/retry",
+            {"user_id": user_id(n), **activity},
+        ),
+    }
+
+
+def seed(users: int, courses: int):
+    """
+    Adds learners with a Siyavula account and extra courses, in bulk
+    """
+    db.session.execute(
+        insert(User),
+        [
+            {
+                "email": f"bench{i}@example.com",
+                "name": "Bench",
+                "surname": str(i),
+                "password_hash": "not-a-real-hash",
+                "grade": 10,
+                "country": "ZA",
+                "curriculum": "CAPS",
+                "role": "Learner",
+                "siyavula_account_id": f"account-{i}",
+            }
+            for i in range(users)
+        ],
+    )
+    existing = Course.query.count()
+    db.session.execute(
+        insert(Course),
+        [{"name": f"course-{i}"} for i in range(existing, courses)],
+    )
+    db.session.commit()
+
+
+def run(
+    client: httpx.Client,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    start: int = 0,
+) -> Tuple[List[float], int, float]:
+    """
+    Sends requests number start..start+requests of the scenario from `concurrency` threads.
+    Returns the latency of each request, the number of errors and the elapsed time.
+    """
+    counter = itertools.count(start)
+    lock = threading.Lock()
+    latencies, errors = [], 0
+
+    def worker():
+        nonlocal errors
+        while True:
+            with lock:
+                n = next(counter)
+            if n >= start + requests:
+                return
+            method, path, body = scenario(n)
+            started = time.perf_counter()
+            response = client.request(method, path, json=body)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    return latencies, errors, time.perf_counter() - started
+
+
+def report(name: str, latencies: List[float], errors: int, elapsed: float):
+    p50, p95, p99 = (
+        statistics.quantiles(latencies, n=100)[i] * 1000 for i in (49, 94, 98)
+    )
+    print(
+        f"{name:>18} {len(latencies):>8} {errors:>7} {len(latencies) / elapsed:>9.1f}"
+        f" {p50:>8.1f} {p95:>8.1f} {p99:>8.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400, help="per scenario")
+    parser.add_argument("--users", type=int, default=1000, help="seeded learners")
+    parser.add_argument("--courses", type=int, default=10, help="seeded courses")
+    parser.add_argument(
+        "--latency", type=float, default=50, help="Siyavula stub latency (ms)"
+    )
+    parser.add_argument(
+        "--body-size", type=int, default=2048, help="Siyavula response size (bytes)"
+    )
+    parser.add_argument(
+        "--scenario", action="append", help="scenario to run, repeatable (default: all)"
+    )
+    parser.add_argument(
+        "--cassette",
+        help="replay Siyavula exchanges recorded with SIAVULA_TRANSPORT_MODE=record "
+        "instead of using the stub",
+    )
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument(
+        "--basic-auth",
+        action="store_true",
+        help="authenticate with Basic credentials instead of a bearer token",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmpdir, 'lms.db')}"
+            SIAVULA_API_CLIENT_NAME = "bench"
+            SIAVULA_API_CLIENT_PASS = "bench"
+            SIAVULA_STREAM_RESPONSES = args.stream
+            if args.cassette:
+                SIAVULA_TRANSPORT_MODE = "replay"
+                SIAVULA_CASSETTE = args.cassette
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            seed(args.users, args.courses)
+        if not args.cassette:
+            SiyavulaStub(args.latency / 1000, args.body_size).install(app)
+
+        # Keep the per-request access log out of the report
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        credentials = (BenchConfig.DEMO_USER_NAME, BenchConfig.DEMO_USER_PASS)
+
+        limits = httpx.Limits(max_connections=args.concurrency)
+        with httpx.Client(base_url=base_url, limits=limits, timeout=60) as client:
+            if args.basic_auth:
+                client.auth = credentials
+            else:
+                token = client.post("/auth/token", auth=credentials).json()["token"]
+                client.headers["Authorization"] = f"Bearer {token}"
+
+            print(
+                f"concurrency={args.concurrency} users={args.users} "
+                f"latency={args.latency:g}ms stream={args.stream}"
+            )
+            print(
+                f"{'scenario':>18} {'requests':>8} {'errors':>7} {'req/s':>9}"
+                f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+            )
+            selected = scenarios(args.users, args.courses)
+            for name in args.scenario or selected:
+                scenario = selected[name]
+                # Warm up connections, tokens and caches, past the measured requests
+                run(client, scenario, args.concurrency, args.concurrency, args.requests)
+                report(name, *run(client, scenario, args.requests, args.concurrency))
+
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
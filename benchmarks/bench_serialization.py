@@ -0,0 +1,71 @@
+"""
+Micro-benchmark of the user list serialisation paths.
+
+Compares the previous per-row path (ORM objects -> to_dict -> pydantic model -> model_dump
+-> jsonify) with json_response (selected columns -> cached TypeAdapter -> dump_json).
+
+    uv run python -m benchmarks.bench_serialization --users 5000 --repeat 20
+"""
+
+import argparse
+import timeit
+
+from flask import jsonify
+from sqlalchemy import insert, select
+
+from lms_backend.app import create_app
+from lms_backend.app.config import TestingConfig
+from lms_backend.app.db import db
+from lms_backend.app.models import User
+from lms_backend.app.users.routes import UserResponseSchema
+from lms_backend.app.utils import json_response, schema_columns, to_dict
+
+
+def seed_users(count: int):
+    rows = [
+        {
+            "email": f"learner{i}@example.com",
+            "name": "Learner",
+            "surname": str(i),
+            "password_hash": "not-a-real-hash",
+            "grade": 10,
+            "country": "ZA",
+            "curriculum": "CAPS",
+            "role": "Learner",
+        }
+        for i in range(count)
+    ]
+    db.session.execute(insert(User), rows)
+    db.session.commit()
+
+
+def per_row_path():
+    users = User.query.all()
+    response_instances = [UserResponseSchema(**to_dict(user, User)) for user in users]
+    return jsonify([instance.model_dump() for instance in response_instances])
+
+
+def bulk_path():
+    users = db.session.execute(select(*schema_columns(UserResponseSchema, User))).all()
+    return json_response(UserResponseSchema, users, many=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app(TestingConfig)
+    with app.test_request_context():
+        seed_users(args.users)
+        assert len(per_row_path().get_json()) == len(bulk_path().get_json())
+
+        for name, path in (("per-row", per_row_path), ("bulk", bulk_path)):
+            db.session.expire_all()
+            seconds = min(timeit.repeat(path, number=1, repeat=args.repeat))
+            print(f"{name:>8}: {seconds * 1000:8.2f} ms for {args.users} users")
+
+
+if __name__ == "__main__":
+    main()
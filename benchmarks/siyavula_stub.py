@@ -0,0 +1,71 @@
+"""
+In-process stand-in for the Siyavula API, with a configurable response latency.
+
+Serves the token, user and practice endpoints through an httpx.MockTransport, so the
+app's real Siyavula code paths run without network access.
+"""
+
+import json
+import time
+import uuid
+
+import httpx
+from flask import Flask
+
+from lms_backend.app.siyavula import services
+
+JSON = {"Content-Type": "application/json"}
+
+
+class SiyavulaStub:
+    def __init__(self, latency: float = 0.05, body_size: int = 2048) -> None:
+        """
+        latency: seconds every Siyavula call takes
+        body_size: approximate size in bytes of the practice activity responses
+        """
+        self.latency = latency
+        self.body_size = body_size
+
+    def response(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.endswith("/get-token"):
+            return httpx.Response(200, json={"token": "client-token"})
+        if path.endswith("/token"):
+            return httpx.Response(200, json={"token": "user-token"})
+        if path.endswith("/user"):
+            return httpx.Response(200, json={"uuid": str(uuid.uuid4())})
+        return httpx.Response(200, content=self.practice_body(), headers=JSON)
+
+    def practice_body(self) -> bytes:
+        activity = {
+            "activity": {
+                "id": str(uuid.uuid4()),
+                "sequence_id": str(uuid.uuid4()),
+                "retry_url": "/retry",
+                "next_url": "/next",
+            },
+            "response": {
+                "id": str(uuid.uuid4()),
+                "complete": False,
+                "question_html": "",
+                "random_seed": 1,
+                "template_id": 1,
+            },
+            "meta": {},
+        }
+        padding = max(0, self.body_size - len(json.dumps(activity)))
+        activity["response"]["question_html"] = "x" * padding
+        return json.dumps(activity).encode("utf-8")
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        time.sleep(self.latency)
+        return self.response(request)
+
+    def install(self, app: Flask):
+        """
+        Route the app's Siyavula traffic to this stub
+        """
+        app.extensions[services.HTTP_CLIENT_EXTENSION] = services.create_http_client(
+            app.config, transport=httpx.MockTransport(self.handler)
+        )
+        services._siyavula_apis.clear()
@@ -0,0 +1,67 @@
+"""
+Gunicorn settings for production serving:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden with the environment variable named in its comment.
+"""
+
+import os
+
+from lms_backend.app.db import dispose_engines
+from lms_backend.app.progress.services import flush_progress
+from lms_backend.app.provisioning.services import stop_provisioning
+from lms_backend.app.siyavula.services import release_http_clients
+
+# Address to listen on (PORT)
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+
+# Worker processes (WEB_CONCURRENCY), defaults to one per core plus one
+workers = int(os.environ.get("WEB_CONCURRENCY", (os.cpu_count() or 1) + 1))
+
+# Threads per worker (GUNICORN_THREADS). Requests mostly wait on the database or the
+# Siyavula API, so threads let a worker overlap them
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Seconds to keep idle client connections open (GUNICORN_KEEPALIVE)
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# Seconds before a silent worker is restarted (GUNICORN_TIMEOUT), and that workers get
+# to finish in-flight requests on shutdown (GUNICORN_GRACEFUL_TIMEOUT)
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+
+# Create the app once in the master (GUNICORN_PRELOAD), so the database bootstrap runs
+# once and workers share the imported, warmed app through copy-on-write
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Restart workers after this many requests, with jitter (GUNICORN_MAX_REQUESTS, 0 = never)
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max(1, max_requests // 10) if max_requests else 0
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+
+
+def post_fork(server, worker):
+    """
+    Connections opened by the master must not be shared with the workers: drop them
+    without closing, so each worker opens its own
+    """
+    if not server.cfg.preload_app:
+        return
+    app = worker.app.wsgi()
+    dispose_engines(app, close=False)
+    release_http_clients(app, close=False)
+
+
+def worker_exit(server, worker):
+    """
+    Let the provisioning threads finish their job and write the queued practice events,
+    then close the worker's pooled database and HTTP connections on shutdown
+    """
+    app = worker.app.wsgi()
+    stop_provisioning(app, timeout=worker.cfg.graceful_timeout)
+    flush_progress(app)
+    dispose_engines(app)
+    release_http_clients(app)
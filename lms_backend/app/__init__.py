@@ -1,7 +1,16 @@
 from typing import Optional
+import time
 
 from flask import render_template
-from lms_backend.app.db import db
+from lms_backend.app.auth import bearer_tokens_enabled
+from lms_backend.app.bootstrap import bootstrap
+from lms_backend.app.db import db, init_db  # noqa: F401 (db is re-exported)
+from lms_backend.app.metrics import init_metrics
+from lms_backend.app.profiler import init_profiler
+from lms_backend.app.progress.routes import progress_bp
+from lms_backend.app.progress.services import init_progress
+from lms_backend.app.provisioning.routes import provisioning_bp
+from lms_backend.app.provisioning.services import init_provisioning
 from lms_backend.app.users.routes import auth_bp
 from lms_backend.app.courses.routes import courses_bp
 from lms_backend.app.siyavula.routes import siyavula_bp
@@ -9,12 +18,11 @@ from lms_backend.app.config import Config
 
 from flask_openapi3 import OpenAPI, Info
 
-from lms_backend.app.utils import create_demo_user, create_standard_courses
-
 # OpenAPI Spec details
 info = Info(title="LMS API", version="0.1.0")
 basic_auth = {"type": "http", "scheme": "basic"}
-security_schemes = {"basic": basic_auth}
+bearer_auth = {"type": "http", "scheme": "bearer"}
+security_schemes = {"basic": basic_auth, "bearer": bearer_auth}
 security = [{"jwt": []}]
 
 
@@ -22,26 +30,40 @@ def create_app(config: Optional[Config] = None):
     """
     Main function to initialise Flask app and register blueprints
     """
+    started = time.perf_counter()
     app = OpenAPI(__name__, info=info, security_schemes=security_schemes)
     if not config:
         config = Config
     app.config.from_object(config)
+    # Flask adds a stderr handler to the app logger, but leaves it at WARNING
+    app.logger.setLevel(app.config["LOG_LEVEL"])
 
-    # Initialize
-    db.init_app(app)
-    with app.app_context():
-        db.create_all()
-        # Demo data
-        create_demo_user(config)
-        create_standard_courses()
+    # Initialize, then create the schema and demo data as BOOTSTRAP_MODE asks
+    init_db(app)
+    init_metrics(app)
+    init_profiler(app)
+    init_provisioning(app)
+    init_progress(app)
+    bootstrap_result = bootstrap(app, config)
+    if not bearer_tokens_enabled(app.config):
+        app.logger.warning(
+            "SECRET_KEY is unset or the default: bearer tokens are disabled"
+        )
 
     # Register blueprints
     app.register_api(auth_bp)
     app.register_api(courses_bp)
+    app.register_api(provisioning_bp)
+    app.register_api(progress_bp)
     app.register_api(siyavula_bp)
 
     @app.route("/")
     def index():
         return render_template("index.html")
 
+    app.logger.info(
+        "App created in %.1f ms (database bootstrap: %s)",
+        (time.perf_counter() - started) * 1000,
+        bootstrap_result,
+    )
     return app
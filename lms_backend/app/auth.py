@@ -1,16 +1,122 @@
-from flask_httpauth import HTTPBasicAuth
+from dataclasses import dataclass
+import hashlib
+import hmac
+import time
+from flask import current_app
+from flask_httpauth import HTTPBasicAuth, HTTPTokenAuth, MultiAuth
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from lms_backend.app.cache import TTLCache
+from lms_backend.app.config import DEFAULT_SECRET_KEY
+from lms_backend.app.metrics import PASSWORD_CHECK
 from lms_backend.app.models import User
 from werkzeug.security import check_password_hash
 
 basic_auth = HTTPBasicAuth()
+token_auth = HTTPTokenAuth(scheme="Bearer")
+# Accepts either HTTP Basic credentials or a bearer token from /auth/token
+auth = MultiAuth(basic_auth, token_auth)
+
+
+@dataclass(frozen=True)
+class TokenUser:
+    """
+    The user a bearer token was issued to, as recorded in the token
+    """
+
+    id: int
+    email: str
+    role: str
+
+
+def bearer_tokens_enabled(config) -> bool:
+    """
+    Whether bearer tokens may be issued and accepted. Anyone could sign tokens with the
+    public default SECRET_KEY, so outside tests a key of our own is required.
+    """
+    return config["TESTING"] or config["SECRET_KEY"] not in ("", DEFAULT_SECRET_KEY)
+
+
+def token_serializer() -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="auth-token")
+
+
+def generate_auth_token(user: User) -> str:
+    """
+    Create a signed, timestamped bearer token for the user
+    """
+    return token_serializer().dumps(
+        {"id": user.id, "email": user.email, "role": user.role}
+    )
+
+
+def get_credential_cache() -> TTLCache:
+    """
+    Returns the current app's cache of recently verified Basic credentials
+    """
+    cache = current_app.extensions.get("credential_cache")
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            "credential_cache",
+            TTLCache(
+                maxsize=current_app.config["AUTH_CREDENTIAL_CACHE_SIZE"],
+                ttl=current_app.config["AUTH_CREDENTIAL_CACHE_TTL"],
+            ),
+        )
+    return cache
+
+
+def credential_key(username: str, password: str) -> str:
+    """
+    Keyed HMAC of a username and password, so the cache never holds plaintext credentials
+    """
+    message = f"{len(username)}:{username}:{password}".encode("utf-8")
+    secret = current_app.config["SECRET_KEY"].encode("utf-8")
+    return hmac.new(secret, message, hashlib.sha256).hexdigest()
 
 
 @basic_auth.verify_password
 def verify_password(username, password):
     """
-    Get the user from the database and verify password
+    Get the user from the database and verify password.
+    Credentials verified recently skip the password hash check, for as long as the
+    user's password hash is unchanged.
     """
     user = User.query.filter_by(email=username).first()
-    if user and check_password_hash(user.password_hash, password):
+    if not user:
+        return None
+
+    started = time.perf_counter()
+    cache_enabled = current_app.config["AUTH_CREDENTIAL_CACHE_TTL"] > 0
+    if cache_enabled:
+        cache = get_credential_cache()
+        key = credential_key(username, password)
+        if hmac.compare_digest(cache.get(key, ""), user.password_hash):
+            PASSWORD_CHECK.observe(time.perf_counter() - started, result="cached")
+            return user
+
+    valid = check_password_hash(user.password_hash, password)
+    PASSWORD_CHECK.observe(
+        time.perf_counter() - started, result="valid" if valid else "invalid"
+    )
+    if valid:
+        if cache_enabled:
+            cache.set(key, user.password_hash)
         return user
     return None
+
+
+@token_auth.verify_token
+def verify_token(token):
+    """
+    Verify the token's signature and age, without a password hash or database lookup.
+    Tokens stay valid until they expire, so AUTH_TOKEN_EXPIRATION should be kept short.
+    """
+    if not bearer_tokens_enabled(current_app.config):
+        return None
+    try:
+        data = token_serializer().loads(
+            token, max_age=current_app.config["AUTH_TOKEN_EXPIRATION"]
+        )
+    except BadSignature:
+        return None
+    return TokenUser(**data)
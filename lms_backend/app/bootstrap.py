@@ -0,0 +1,88 @@
+from hashlib import sha256
+import time
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from lms_backend.app.config import Config
+from lms_backend.app.db import create_indexes, db
+from lms_backend.app.models import BootstrapState
+from lms_backend.app.utils import (
+    STANDARD_COURSES,
+    create_demo_user,
+    create_standard_courses,
+)
+
+BOOTSTRAP_MODES = ("auto", "full", "skip")
+
+
+def schema_fingerprint(config: Config) -> str:
+    """
+    Hash of the tables, columns, indexes and seed data that a full bootstrap creates.
+    It changes whenever a model or the seed data changes, forcing a new full bootstrap.
+    """
+    parts = [config.DEMO_USER_NAME, *STANDARD_COURSES]
+    for table in db.metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f"{column.name}:{column.type}" for column in table.columns)
+        parts.extend(
+            f"{index.name}:{','.join(index.columns.keys())}:{index.unique}"
+            for index in sorted(table.indexes, key=lambda index: index.name)
+        )
+    return sha256("\n".join(parts).encode()).hexdigest()
+
+
+def is_bootstrapped(fingerprint: str) -> bool:
+    """
+    Whether a full bootstrap with this fingerprint has already run on the database
+    """
+    try:
+        state = db.session.get(BootstrapState, 1)
+    except (OperationalError, ProgrammingError):
+        # The table does not exist yet
+        db.session.rollback()
+        return False
+    return state is not None and state.fingerprint == fingerprint
+
+
+def bootstrap_database(config: Config, fingerprint: str):
+    """
+    Creates missing tables and indexes, and seeds the demo user and standard courses
+    in one transaction
+    """
+    db.create_all()
+    create_indexes()
+    create_demo_user(config)
+    create_standard_courses()
+    db.session.merge(BootstrapState(id=1, fingerprint=fingerprint))
+    db.session.commit()
+
+
+def bootstrap(app: Flask, config: Config) -> str:
+    """
+    Prepares the database according to BOOTSTRAP_MODE and returns what was done:
+    - auto: full bootstrap, unless the schema and seed data are already in place
+    - full: always run the full bootstrap
+    - skip: leave the database alone, e.g. when a release step prepares it
+    """
+    mode = app.config["BOOTSTRAP_MODE"]
+    if mode not in BOOTSTRAP_MODES:
+        raise ValueError(f"Unsupported BOOTSTRAP_MODE: {mode}")
+    if mode == "skip":
+        return "skipped"
+
+    started = time.perf_counter()
+    with app.app_context():
+        fingerprint = schema_fingerprint(config)
+        if mode == "auto" and is_bootstrapped(fingerprint):
+            result = "up to date"
+        else:
+            bootstrap_database(config, fingerprint)
+            result = "full"
+        db.session.remove()
+    app.logger.info(
+        "Database bootstrap (%s) took %.1f ms",
+        result,
+        (time.perf_counter() - started) * 1000,
+    )
+    return result
@@ -1,12 +1,61 @@
 import os
 
+# Placeholder SECRET_KEY, public in this repository
+DEFAULT_SECRET_KEY = "supersecretkey"
+
 
 class Config:
-    SECRET_KEY = os.environ.get("SECRET_KEY", "supersecretkey")
+    # Signs bearer tokens and keys the credential cache. Outside tests, bearer tokens
+    # are refused while it is unset or left at DEFAULT_SECRET_KEY
+    SECRET_KEY = os.environ.get("SECRET_KEY", DEFAULT_SECRET_KEY)
+    # Lifetime (seconds) of bearer tokens issued by /auth/token
+    AUTH_TOKEN_EXPIRATION = int(os.environ.get("AUTH_TOKEN_EXPIRATION", 3600))
+    # Recently verified Basic credentials skip password hashing for this long (0 disables)
+    AUTH_CREDENTIAL_CACHE_TTL = int(os.environ.get("AUTH_CREDENTIAL_CACHE_TTL", 300))
+    AUTH_CREDENTIAL_CACHE_SIZE = int(os.environ.get("AUTH_CREDENTIAL_CACHE_SIZE", 1024))
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URI", "sqlite:///lms.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLite connection pragmas: WAL lets readers proceed during writes, NORMAL sync
+    # is durable in WAL mode, busy timeout in ms, cache size in KiB when negative
+    DB_SQLITE_JOURNAL_MODE = os.environ.get("DB_SQLITE_JOURNAL_MODE", "WAL")
+    DB_SQLITE_SYNCHRONOUS = os.environ.get("DB_SQLITE_SYNCHRONOUS", "NORMAL")
+    DB_SQLITE_BUSY_TIMEOUT = int(os.environ.get("DB_SQLITE_BUSY_TIMEOUT", 5000))
+    DB_SQLITE_CACHE_SIZE = int(os.environ.get("DB_SQLITE_CACHE_SIZE", -64000))
+    DB_SQLITE_MMAP_SIZE = int(os.environ.get("DB_SQLITE_MMAP_SIZE", 268435456))
+    # Connection pool of server databases (e.g. PostgreSQL); timeouts in seconds
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
     DEMO_USER_NAME = os.environ.get("DEMO_USER_NAME", "foo@bar.co")
     DEMO_USER_PASS = os.environ.get("DEMO_USER_PASS", "changeme")
+    # Serve request, database, auth and Siyavula metrics at /metrics in Prometheus format
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+    # Bearer token a Prometheus scraper may send for /metrics instead of user credentials
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+    # Profile the SQL of each request: Server-Timing header and a JSON log line, which
+    # flags statements run at least SQL_PROFILER_REPEAT_THRESHOLD times (N+1 queries)
+    SQL_PROFILER_ENABLED = (
+        os.environ.get("SQL_PROFILER_ENABLED", "false").lower() == "true"
+    )
+    SQL_PROFILER_REPEAT_THRESHOLD = int(
+        os.environ.get("SQL_PROFILER_REPEAT_THRESHOLD", 2)
+    )
+    # Database bootstrap on startup: "auto" skips it once the schema and seed data exist,
+    # "full" always runs it, "skip" never does (e.g. when a release step prepares the DB)
+    BOOTSTRAP_MODE = os.environ.get("BOOTSTRAP_MODE", "auto")
+    # Level of the app's own log lines, e.g. the startup and bootstrap timings at INFO
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+    # Bulk user import: rows per request, password hashing threads and INSERT batch size
+    BULK_IMPORT_MAX_ROWS = int(os.environ.get("BULK_IMPORT_MAX_ROWS", 1000))
+    BULK_IMPORT_HASH_WORKERS = int(
+        os.environ.get("BULK_IMPORT_HASH_WORKERS", os.cpu_count() or 1)
+    )
+    BULK_IMPORT_BATCH_SIZE = int(os.environ.get("BULK_IMPORT_BATCH_SIZE", 500))
+    # Bulk course assignment: most (user, course) pairs per request and INSERT batch size
+    BULK_ASSIGN_MAX_PAIRS = int(os.environ.get("BULK_ASSIGN_MAX_PAIRS", 5000))
+    BULK_ASSIGN_BATCH_SIZE = int(os.environ.get("BULK_ASSIGN_BATCH_SIZE", 500))
 
     SIAVULA_API_CLIENT_NAME = os.environ.get("SIAVULA_API_CLIENT_NAME")
     SIAVULA_API_CLIENT_PASS = os.environ.get("SIAVULA_API_CLIENT_PASS")
@@ -14,11 +63,119 @@ class Config:
     SIAVULA_API_CLIENT_CURRICULUM = os.environ.get(
         "SIAVULA_API_CLIENT_CURRICULUM", "CAPS"
     )
+    # Other "REGION:CURRICULUM" pairs, comma separated, whose table of contents may be requested
+    SIAVULA_EXTRA_CURRICULA = os.environ.get("SIAVULA_EXTRA_CURRICULA", "")
+    SIAVULA_API_BASE_URL = os.environ.get(
+        "SIAVULA_API_BASE_URL", "https://www.siyavula.com/api/siyavula/v1"
+    )
+    # Siyavula traffic: "live", "record" (to SIAVULA_CASSETTE) or "replay" (from it,
+    # taking the recorded time divided by SIAVULA_REPLAY_SPEED, 0 for no delay)
+    SIAVULA_TRANSPORT_MODE = os.environ.get("SIAVULA_TRANSPORT_MODE", "live")
+    SIAVULA_CASSETTE = os.environ.get("SIAVULA_CASSETTE", "siyavula_cassette.jsonl")
+    SIAVULA_REPLAY_SPEED = float(os.environ.get("SIAVULA_REPLAY_SPEED", 1))
+    # Fallback lifetime (seconds) of a Siyavula token that does not carry an expiry
+    SIAVULA_CLIENT_TOKEN_TTL = int(os.environ.get("SIAVULA_CLIENT_TOKEN_TTL", 3600))
+    # Refresh the Siyavula client token in the background this many seconds before expiry
+    SIAVULA_TOKEN_REFRESH_MARGIN = int(
+        os.environ.get("SIAVULA_TOKEN_REFRESH_MARGIN", 60)
+    )
+    # Number of Siyavula user tokens cached per process
+    SIAVULA_USER_TOKEN_CACHE_SIZE = int(
+        os.environ.get("SIAVULA_USER_TOKEN_CACHE_SIZE", 1024)
+    )
+    # Connection pool and timeouts (seconds) of the shared Siyavula HTTP client
+    SIAVULA_HTTP_MAX_CONNECTIONS = int(
+        os.environ.get("SIAVULA_HTTP_MAX_CONNECTIONS", 100)
+    )
+    SIAVULA_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(
+        os.environ.get("SIAVULA_HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)
+    )
+    SIAVULA_HTTP_KEEPALIVE_EXPIRY = float(
+        os.environ.get("SIAVULA_HTTP_KEEPALIVE_EXPIRY", 30)
+    )
+    SIAVULA_HTTP_CONNECT_TIMEOUT = float(
+        os.environ.get("SIAVULA_HTTP_CONNECT_TIMEOUT", 5)
+    )
+    SIAVULA_HTTP_READ_TIMEOUT = float(os.environ.get("SIAVULA_HTTP_READ_TIMEOUT", 30))
+    SIAVULA_HTTP2 = os.environ.get("SIAVULA_HTTP2", "true").lower() == "true"
+    # Read timeouts (seconds) of Siyavula token/account calls and of practice calls
+    SIAVULA_TOKEN_TIMEOUT = float(os.environ.get("SIAVULA_TOKEN_TIMEOUT", 5))
+    SIAVULA_PRACTICE_TIMEOUT = float(os.environ.get("SIAVULA_PRACTICE_TIMEOUT", 15))
+    # Extra attempts of failed read-only Siyavula calls (or any call that never connected),
+    # with jittered backoff from this base (seconds)
+    SIAVULA_RETRIES = int(os.environ.get("SIAVULA_RETRIES", 2))
+    SIAVULA_RETRY_BACKOFF = float(os.environ.get("SIAVULA_RETRY_BACKOFF", 0.1))
+    # Fail fast with a 503 for SIAVULA_BREAKER_RESET seconds after this many consecutive
+    # Siyavula failures
+    SIAVULA_BREAKER_FAILURES = int(os.environ.get("SIAVULA_BREAKER_FAILURES", 5))
+    SIAVULA_BREAKER_RESET = float(os.environ.get("SIAVULA_BREAKER_RESET", 30))
+    # Seconds after which an unfinished Siyavula account creation by another worker is
+    # taken over
+    SIAVULA_ACCOUNT_CLAIM_TIMEOUT = float(
+        os.environ.get("SIAVULA_ACCOUNT_CLAIM_TIMEOUT", 30)
+    )
+    # Create the Siyavula accounts of new users in background threads, so their first
+    # practice request does not wait for it
+    SIAVULA_PROVISIONING_ENABLED = (
+        os.environ.get("SIAVULA_PROVISIONING_ENABLED", "false").lower() == "true"
+    )
+    # Accounts created at once per process
+    SIAVULA_PROVISIONING_WORKERS = int(
+        os.environ.get("SIAVULA_PROVISIONING_WORKERS", 4)
+    )
+    # Attempts per account, retried after SIAVULA_PROVISIONING_RETRY_BACKOFF seconds,
+    # doubling each time
+    SIAVULA_PROVISIONING_MAX_ATTEMPTS = int(
+        os.environ.get("SIAVULA_PROVISIONING_MAX_ATTEMPTS", 5)
+    )
+    SIAVULA_PROVISIONING_RETRY_BACKOFF = float(
+        os.environ.get("SIAVULA_PROVISIONING_RETRY_BACKOFF", 10)
+    )
+    # Seconds between looks for due jobs when idle
+    SIAVULA_PROVISIONING_POLL_INTERVAL = float(
+        os.environ.get("SIAVULA_PROVISIONING_POLL_INTERVAL", 5)
+    )
+    # Seconds after which a job left running by a stopped worker is picked up again
+    SIAVULA_PROVISIONING_STALE_AFTER = float(
+        os.environ.get("SIAVULA_PROVISIONING_STALE_AFTER", 120)
+    )
+    # Record the practice responses proxied from Siyavula, for the /progress endpoints.
+    # Events are written by a background thread in batches of PRACTICE_PROGRESS_BATCH_SIZE,
+    # at least every PRACTICE_PROGRESS_FLUSH_INTERVAL seconds; events beyond
+    # PRACTICE_PROGRESS_QUEUE_SIZE waiting to be written are dropped.
+    PRACTICE_PROGRESS_ENABLED = (
+        os.environ.get("PRACTICE_PROGRESS_ENABLED", "true").lower() == "true"
+    )
+    PRACTICE_PROGRESS_BATCH_SIZE = int(
+        os.environ.get("PRACTICE_PROGRESS_BATCH_SIZE", 100)
+    )
+    PRACTICE_PROGRESS_FLUSH_INTERVAL = float(
+        os.environ.get("PRACTICE_PROGRESS_FLUSH_INTERVAL", 1)
+    )
+    PRACTICE_PROGRESS_QUEUE_SIZE = int(
+        os.environ.get("PRACTICE_PROGRESS_QUEUE_SIZE", 1000)
+    )
+    # Seconds the Siyavula table of contents is served from cache before it is revalidated,
+    # the directory it is stored in ("" to only keep it in memory), and the number of
+    # tables of contents kept in memory
+    SIAVULA_TOC_TTL = float(os.environ.get("SIAVULA_TOC_TTL", 86400))
+    SIAVULA_TOC_CACHE_DIR = os.environ.get("SIAVULA_TOC_CACHE_DIR", "siyavula_toc")
+    SIAVULA_TOC_CACHE_SIZE = int(os.environ.get("SIAVULA_TOC_CACHE_SIZE", 64))
+    # Stream Siyavula practice responses to our client instead of buffering them
+    SIAVULA_STREAM_RESPONSES = (
+        os.environ.get("SIAVULA_STREAM_RESPONSES", "false").lower() == "true"
+    )
 
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     DEBUG = False
+    LOG_LEVEL = "WARNING"
     DEMO_USER_NAME = "test@user.com"
     DEMO_USER_PASS = "test_pass"
+    BULK_IMPORT_HASH_WORKERS = 1
+    SIAVULA_RETRY_BACKOFF = 0.01
+    # The recorder thread cannot share the in-memory database, see test_progress.py
+    PRACTICE_PROGRESS_ENABLED = False
+    SIAVULA_TOC_CACHE_DIR = ""
@@ -1,12 +1,17 @@
-from flask import jsonify
-from pydantic import BaseModel
-from sqlalchemy import and_
+from typing import List
+from itertools import product
+from flask import current_app, jsonify
+from pydantic import BaseModel, RootModel, model_validator
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select
 from lms_backend.app.models import Course, User, UserCourse
-from lms_backend.app.db import db
+from lms_backend.app.db import db, insert_ignoring_conflicts
 from flask_openapi3 import Tag, APIBlueprint
-from lms_backend.app.auth import basic_auth
+from lms_backend.app.auth import auth
 
-from lms_backend.app.utils import to_dict
+from lms_backend.app.courses.services import BulkAssignmentResult, bulk_assign_courses
+from lms_backend.app.utils import json_response, schema_columns
+from lms_backend.app.versioning import conditional
 
 # Set tags for use in OpenAPI Swagger documentation
 courses_tag = Tag(name="courses", description="Course Assignments")
@@ -16,6 +21,15 @@ courses_bp = APIBlueprint("courses", __name__)
 
 
 # Pydantic models for validation
+class CourseResponseSchema(BaseModel):
+    id: int
+    name: str
+
+
+class CourseListResponseSchema(RootModel[List[CourseResponseSchema]]):
+    pass
+
+
 class AssignmentCreateSchema(BaseModel):
     user_id: int
     course_id: int
@@ -27,33 +41,103 @@ class AssignmentResponseSchema(BaseModel):
     course_id: int
 
 
+class BulkAssignmentCreateSchema(BaseModel):
+    """
+    Explicit (user_id, course_id) pairs, and/or every user in user_ids assigned to every course in course_ids
+    """
+
+    assignments: List[AssignmentCreateSchema] = []
+    user_ids: List[int] = []
+    course_ids: List[int] = []
+
+    @model_validator(mode="after")
+    def check_pairs(self):
+        if not self.assignments and not (self.user_ids and self.course_ids):
+            raise ValueError("Provide assignments, or both user_ids and course_ids")
+        return self
+
+    def pairs(self):
+        return [(a.user_id, a.course_id) for a in self.assignments] + list(
+            product(self.user_ids, self.course_ids)
+        )
+
+
+class BulkAssignmentResponseSchema(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkAssignmentResult]
+
+
+@courses_bp.get(
+    "/courses", tags=[courses_tag], responses={200: CourseListResponseSchema, 304: {}}
+)
+@auth.login_required
+@conditional("course")
+def get_courses():
+    """
+    List all courses, ordered by id.
+    Supports If-None-Match and If-Modified-Since, answered with a 304 while no course changed.
+    """
+    courses = db.session.execute(
+        select(*schema_columns(CourseResponseSchema, Course)).order_by(Course.id)
+    ).all()
+    return json_response(CourseResponseSchema, courses, many=True)
+
+
 @courses_bp.post(
     "/assignments",
     tags=[courses_tag],
     responses={200: AssignmentResponseSchema, 409: {}},
 )
-@basic_auth.login_required
+@auth.login_required
 def assign_course(body: AssignmentCreateSchema):
     """
     Assign course to user
     """
-    # Check if assignment already exists
-    if UserCourse.query.filter(
-        and_(UserCourse.user_id == body.user_id, UserCourse.course_id == body.course_id)
-    ).first():
+    values = body.model_dump()
+    statement = insert_ignoring_conflicts(UserCourse, ["user_id", "course_id"])
+    try:
+        assignment_id = db.session.execute(
+            statement.values(**values).returning(UserCourse.id)
+        ).scalar()
+    except IntegrityError:
+        # A foreign key was violated, find out which one
+        db.session.rollback()
+        if not db.session.get(User, body.user_id):
+            return jsonify({"message": "User with this id does not exist"}), 400
+        return jsonify({"message": "Course with this id does not exist"}), 400
+
+    # Nothing was inserted if the assignment already exists
+    if assignment_id is None:
+        db.session.rollback()
         return jsonify({"message": "User-Course Assignment already exists"}), 409
+    db.session.commit()
 
-    # Check if user exists
-    if not User.query.filter_by(id=body.user_id).first():
-        return jsonify({"message": "User with this id does not exist"}), 400
+    return json_response(
+        AssignmentResponseSchema, {"id": assignment_id, **values}, status=201
+    )
 
-    # Check if course exists
-    if not Course.query.filter_by(id=body.course_id).first():
-        return jsonify({"message": "Course with this id does not exist"}), 400
 
-    user_course = UserCourse(user_id=body.user_id, course_id=body.course_id)
-    db.session.add(user_course)
-    db.session.commit()
+@courses_bp.post(
+    "/assignments/bulk",
+    tags=[courses_tag],
+    responses={200: BulkAssignmentResponseSchema, 413: {}},
+)
+@auth.login_required
+def assign_courses_bulk(body: BulkAssignmentCreateSchema):
+    """
+    Assign many courses to many users
+    """
+    pairs = body.pairs()
+    max_pairs = current_app.config["BULK_ASSIGN_MAX_PAIRS"]
+    if len(pairs) > max_pairs:
+        return jsonify({"message": f"At most {max_pairs} assignments per request"}), 413
 
-    response_instance = AssignmentResponseSchema(**to_dict(user_course, UserCourse))
-    return jsonify(response_instance.model_dump()), 201
+    results = bulk_assign_courses(
+        pairs, batch_size=current_app.config["BULK_ASSIGN_BATCH_SIZE"]
+    )
+    created = sum(result.status == "created" for result in results)
+    response_instance = BulkAssignmentResponseSchema(
+        created=created, failed=len(results) - created, results=results
+    )
+    return jsonify(response_instance.model_dump()), 200
@@ -0,0 +1,106 @@
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import select
+
+from lms_backend.app.db import db, insert_ignoring_conflicts
+from lms_backend.app.models import Course, User, UserCourse
+from lms_backend.app.utils import IN_CLAUSE_CHUNK_SIZE, chunked
+
+
+class BulkAssignmentResult(BaseModel):
+    user_id: int
+    course_id: int
+    status: str
+    id: Optional[int] = None
+    message: Optional[str] = None
+
+
+def existing_ids(column, ids: List[int]) -> set:
+    """
+    The given ids that exist in `column`'s table
+    """
+    found = set()
+    for chunk in chunked(ids):
+        found.update(db.session.scalars(select(column).where(column.in_(chunk))))
+    return found
+
+
+def existing_assignments(
+    user_ids: List[int], course_ids: List[int]
+) -> Dict[Tuple[int, int], int]:
+    """
+    Assignment ids of the existing (user_id, course_id) pairs among the given users and courses.
+    Both id lists are chunked, so a query binds at most IN_CLAUSE_CHUNK_SIZE ids.
+    """
+    found = {}
+    size = max(1, IN_CLAUSE_CHUNK_SIZE // 2)
+    for user_chunk in chunked(user_ids, size):
+        for course_chunk in chunked(course_ids, size):
+            query = select(
+                UserCourse.user_id, UserCourse.course_id, UserCourse.id
+            ).where(
+                UserCourse.user_id.in_(user_chunk),
+                UserCourse.course_id.in_(course_chunk),
+            )
+            found.update(
+                ((user_id, course_id), id)
+                for user_id, course_id, id in db.session.execute(query)
+            )
+    return found
+
+
+def bulk_assign_courses(
+    pairs: List[Tuple[int, int]], batch_size: int
+) -> List[BulkAssignmentResult]:
+    """
+    Assign many (user_id, course_id) pairs in a single transaction.
+    All pairs are checked with a few IN queries, and a result is returned per pair, in input order.
+    """
+    user_ids = sorted({user_id for user_id, _ in pairs})
+    course_ids = sorted({course_id for _, course_id in pairs})
+    users = existing_ids(User.id, user_ids)
+    courses = existing_ids(Course.id, course_ids)
+    assigned = existing_assignments(user_ids, course_ids)
+
+    results = []
+    new = []
+    seen = set()
+    for user_id, course_id in pairs:
+        result = BulkAssignmentResult(
+            user_id=user_id, course_id=course_id, status="created"
+        )
+        results.append(result)
+        if (user_id, course_id) in assigned or (user_id, course_id) in seen:
+            result.status = "duplicate"
+            result.message = "User-Course Assignment already exists"
+        elif user_id not in users:
+            result.status = "invalid"
+            result.message = "User with this id does not exist"
+        elif course_id not in courses:
+            result.status = "invalid"
+            result.message = "Course with this id does not exist"
+        else:
+            seen.add((user_id, course_id))
+            new.append(result)
+
+    # Pairs assigned concurrently since the check above are skipped by the database
+    statement = insert_ignoring_conflicts(UserCourse, ["user_id", "course_id"])
+    statement = statement.returning(
+        UserCourse.user_id, UserCourse.course_id, UserCourse.id
+    )
+    values = [{"user_id": r.user_id, "course_id": r.course_id} for r in new]
+    created = {}
+    for batch in chunked(values, batch_size):
+        created.update(
+            ((user_id, course_id), id)
+            for user_id, course_id, id in db.session.execute(statement, batch)
+        )
+    db.session.commit()
+
+    for result in new:
+        result.id = created.get((result.user_id, result.course_id))
+        if result.id is None:
+            result.status = "duplicate"
+            result.message = "User-Course Assignment already exists"
+    return results
@@ -1,13 +1,189 @@
+from typing import Any, Callable, Dict, List
+import logging
+import time
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import event
-from sqlalchemy.engine import Engine
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
 
 db = SQLAlchemy()
 
+QUERY_OBSERVERS_EXTENSION = "query_observers"
+# Unique indexes added to existing tables whose duplicate rows may be deleted first,
+# keeping the oldest: an assignment repeated by the old check-then-insert is redundant
+DEDUPLICATED_INDEXES = {"uq_user_course_user_id_course_id"}
 
-# Set Foreign key enforcement to ON
-@event.listens_for(Engine, "connect")
-def set_sqlite_pragma(dbapi_connection, connection_record):
-    cursor = dbapi_connection.cursor()
-    cursor.execute("PRAGMA foreign_keys=ON;")
-    cursor.close()
+logger = logging.getLogger(__name__)
+
+SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SQLITE_SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def sqlite_pragmas(config) -> List[str]:
+    """
+    PRAGMA statements run on every new SQLite connection, built from the DB_SQLITE_*
+    settings. Values are validated here as PRAGMA arguments cannot be bound parameters
+    """
+    journal_mode = config["DB_SQLITE_JOURNAL_MODE"].upper()
+    synchronous = config["DB_SQLITE_SYNCHRONOUS"].upper()
+    if journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f"Unsupported DB_SQLITE_JOURNAL_MODE: {journal_mode}")
+    if synchronous not in SQLITE_SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Unsupported DB_SQLITE_SYNCHRONOUS: {synchronous}")
+
+    return [
+        # Set Foreign key enforcement to ON
+        "PRAGMA foreign_keys=ON;",
+        f"PRAGMA journal_mode={journal_mode};",
+        f"PRAGMA synchronous={synchronous};",
+        f"PRAGMA busy_timeout={int(config['DB_SQLITE_BUSY_TIMEOUT'])};",
+        f"PRAGMA cache_size={int(config['DB_SQLITE_CACHE_SIZE'])};",
+        f"PRAGMA mmap_size={int(config['DB_SQLITE_MMAP_SIZE'])};",
+    ]
+
+
+def engine_options(config) -> Dict[str, Any]:
+    """
+    Pool options for server databases, e.g. PostgreSQL. SQLite engines keep
+    Flask-SQLAlchemy's defaults, as its single-connection pools reject pool sizing
+    """
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+
+
+def set_sqlite_pragmas(engine: Engine, pragmas: List[str]):
+    """
+    Run the pragmas whenever the engine opens a new DBAPI connection
+    """
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def init_db(app: Flask):
+    """
+    Initialise the database extension with the configured engine options, and run the
+    SQLite pragmas on each new connection of SQLite engines only
+    """
+    options = engine_options(app.config)
+    # Explicit SQLALCHEMY_ENGINE_OPTIONS take precedence over the DB_POOL_* settings
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **options,
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+    }
+    db.init_app(app)
+
+    pragmas = sqlite_pragmas(app.config)
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == "sqlite":
+                set_sqlite_pragmas(engine, pragmas)
+
+
+def observe_queries(app: Flask, observer: Callable[[str, float], None]):
+    """
+    Calls observer(statement, seconds) after every SQL statement run by the app's engines.
+    The engines get one set of timing listeners, shared by all observers.
+    """
+    observers = app.extensions.get(QUERY_OBSERVERS_EXTENSION)
+    if observers is None:
+        observers = app.extensions[QUERY_OBSERVERS_EXTENSION] = []
+        with app.app_context():
+            for engine in db.engines.values():
+                time_queries(engine, observers)
+    observers.append(observer)
+
+
+def time_queries(engine: Engine, observers: List[Callable[[str, float], None]]):
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        for observer in observers:
+            observer(statement, seconds)
+
+    @event.listens_for(engine, "handle_error")
+    def discard_query_timer(exception_context):
+        # Only statement errors skip after_cursor_execute after a before_cursor_execute
+        if exception_context.execution_context is not None:
+            timers = exception_context.connection.info.get("query_started")
+            if timers:
+                timers.pop()
+
+
+def dispose_engines(app: Flask, close: bool = True):
+    """
+    Discards the app's pooled database connections; new ones are opened on next use.
+    After a fork pass close=False, so the parent's connections are left untouched.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+
+def delete_duplicates(connection, table, columns) -> int:
+    """
+    Delete all but the oldest row of each group of rows sharing the values of `columns`,
+    so a unique index can be created on them. Returns the number of deleted rows.
+    """
+    (key,) = table.primary_key.columns
+    keep = select(func.min(key)).group_by(*columns)
+    return connection.execute(table.delete().where(key.not_in(keep))).rowcount
+
+
+def create_indexes():
+    """
+    Create model indexes that are missing on existing tables, which create_all() skips.
+    For the unique indexes in DEDUPLICATED_INDEXES, rows that would violate the index
+    are deleted first, keeping the oldest, and logged. Other unique indexes fail on
+    duplicates, so that no data is dropped unnoticed.
+    """
+    inspector = inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                if index.name in DEDUPLICATED_INDEXES:
+                    deleted = delete_duplicates(connection, table, index.columns)
+                    if deleted:
+                        logger.warning(
+                            "Deleted %d duplicate rows from %s to create %s",
+                            deleted,
+                            table.name,
+                            index.name,
+                        )
+                index.create(connection)
+
+
+def insert_ignoring_conflicts(model, index_elements: List[str]):
+    """
+    INSERT ... ON CONFLICT (index_elements) DO NOTHING for the model's table, so a
+    duplicate is detected by the database in the same statement instead of a prior SELECT.
+    Supports SQLite and PostgreSQL; add .returning() to learn which rows were inserted.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT is not supported for {dialect}")
+    return insert(model).on_conflict_do_nothing(index_elements=index_elements)
@@ -0,0 +1,203 @@
+from typing import Dict, Iterator, List, Sequence, Tuple
+import hmac
+import re
+import threading
+import time
+
+from flask import Flask, Response, g, has_request_context, request
+
+from lms_backend.app.db import observe_queries
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Upper bounds of the queries per request histogram buckets
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """
+    Thread-safe Prometheus histogram with labels. Values are kept per process, so under
+    Gunicorn every worker reports its own.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label values: count per bucket, sum and count
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = {key: (list(b), s, c) for key, (b, s, c) in self._series.items()}
+        for key, (bucket_counts, total, count) in sorted(series.items()):
+            labels = list(zip(self.labelnames, key))
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                le = format_labels(labels + [("le", repr(float(bound)))])
+                yield f"{self.name}_bucket{le} {bucket_count}"
+            yield f"{self.name}_bucket{format_labels(labels + [('le', '+Inf')])} {count}"
+            yield f"{self.name}_sum{format_labels(labels)} {total}"
+            yield f"{self.name}_count{format_labels(labels)} {count}"
+
+
+def format_labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+REGISTRY: List[Histogram] = []
+
+
+def render() -> str:
+    """
+    All metrics in the Prometheus text exposition format
+    """
+    return "\n".join(line for metric in REGISTRY for line in metric.collect()) + "\n"
+
+
+REQUEST_DURATION = Histogram(
+    "lms_http_request_duration_seconds",
+    "Time to handle a request, until the response headers are ready",
+    ("blueprint", "endpoint", "method", "status"),
+)
+DB_QUERIES = Histogram(
+    "lms_db_queries_per_request",
+    "Number of SQL statements executed by a request",
+    ("blueprint", "endpoint"),
+    buckets=COUNT_BUCKETS,
+)
+DB_TIME = Histogram(
+    "lms_db_time_per_request_seconds",
+    "Time a request spent executing SQL statements",
+    ("blueprint", "endpoint"),
+)
+PASSWORD_CHECK = Histogram(
+    "lms_auth_password_check_seconds",
+    "Time to verify Basic auth credentials: cached, or hashed and valid or invalid",
+    ("result",),
+)
+UPSTREAM_DURATION = Histogram(
+    "lms_siyavula_request_duration_seconds",
+    "Time until Siyavula responded with headers, by operation and status",
+    ("operation", "status"),
+)
+
+# Siyavula operations by URL path, so that ids do not become label values
+UPSTREAM_OPERATIONS = [
+    (re.compile(r"/get-token$"), "get-token"),
+    (re.compile(r"/user/[^/]+/token$"), "user token"),
+    (re.compile(r"/user$"), "create user"),
+    (re.compile(r"/activity/create/practice/[^/]+$"), "create practice activity"),
+    (re.compile(r"/activity/[^/]+/response/[^/]+/submit-answer$"), "submit-answer"),
+    (re.compile(r"/activity/[^/]+/response/[^/]+/next$"), "next question"),
+    (re.compile(r"/activity/[^/]+/response/[^/]+/retry$"), "retry"),
+    (re.compile(r"/toc/subject/[^/]+/grade/[^/]+$"), "toc"),
+]
+
+
+def upstream_operation(path: str) -> str:
+    for pattern, operation in UPSTREAM_OPERATIONS:
+        if pattern.search(path):
+            return operation
+    return "other"
+
+
+def observe_upstream(request_path: str, started: float, status):
+    UPSTREAM_DURATION.observe(
+        time.perf_counter() - started,
+        operation=upstream_operation(request_path),
+        status=status,
+    )
+
+
+def request_labels() -> Dict[str, str]:
+    return {
+        "blueprint": request.blueprint or "app",
+        "endpoint": request.url_rule.rule if request.url_rule else "unmatched",
+    }
+
+
+def init_metrics(app: Flask):
+    """
+    Records request latency and per-request database use, and serves all metrics at
+    /metrics to an authenticated user, or to a scraper sending METRICS_TOKEN as a bearer
+    token. Disabled with METRICS_ENABLED=false.
+    """
+    # Imported here, as auth records its password checks in this module's metrics
+    from lms_backend.app.auth import auth
+
+    if not app.config["METRICS_ENABLED"]:
+        return
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_time = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        labels = request_labels()
+        REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            status=response.status_code,
+            **labels,
+        )
+        DB_QUERIES.observe(g.db_queries, **labels)
+        DB_TIME.observe(g.db_time, **labels)
+        return response
+
+    observe_queries(app, count_query)
+
+    def serve_metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
+
+    serve_to_user = auth.login_required(serve_metrics)
+
+    @app.route("/metrics")
+    def metrics():
+        token = app.config["METRICS_TOKEN"]
+        authorization = request.headers.get("Authorization", "")
+        if token and hmac.compare_digest(
+            authorization.encode("utf-8"), f"Bearer {token}".encode("utf-8")
+        ):
+            return serve_metrics()
+        return serve_to_user()
+
+
+def count_query(statement: str, seconds: float):
+    if has_request_context() and "db_queries" in g:
+        g.db_queries += 1
+        g.db_time += seconds
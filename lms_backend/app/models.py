@@ -14,6 +14,14 @@ class User(db.Model):
     role = db.Column(db.String(10), nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
 
+    # Composite indexes for filtered, id-ordered (keyset) listing of users
+    __table_args__ = (
+        db.Index("ix_user_grade_id", "grade", "id"),
+        db.Index("ix_user_role_id", "role", "id"),
+        db.Index("ix_user_curriculum_id", "curriculum", "id"),
+        db.Index("ix_user_country_id", "country", "id"),
+    )
+
 
 class Course(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -23,6 +31,93 @@ class Course(db.Model):
 
 class UserCourse(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    course_id = db.Column(db.Integer, db.ForeignKey("course.id"), nullable=False)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("user.id"), nullable=False, index=True
+    )
+    course_id = db.Column(
+        db.Integer, db.ForeignKey("course.id"), nullable=False, index=True
+    )
     assigned_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    # A unique index rather than a constraint, so create_indexes() can add it to existing tables
+    __table_args__ = (
+        db.Index(
+            "uq_user_course_user_id_course_id", "user_id", "course_id", unique=True
+        ),
+    )
+
+
+class BootstrapState(db.Model):
+    """
+    Single row recording the schema and seed data fingerprint of the last full bootstrap
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    bootstrapped_at = db.Column(
+        db.DateTime,
+        default=db.func.current_timestamp(),
+        onupdate=db.func.current_timestamp(),
+    )
+
+
+class ProvisioningJob(db.Model):
+    """
+    Background creation of a user's Siyavula account, one job per user
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    # pending, running, done or failed
+    status = db.Column(db.String(10), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(
+        db.DateTime, nullable=False, default=db.func.current_timestamp()
+    )
+    claimed_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    last_error = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.Index("uq_provisioning_job_user_id", "user_id", unique=True),
+        # Workers look for due jobs by status and time
+        db.Index(
+            "ix_provisioning_job_status_next_attempt_at", "status", "next_attempt_at"
+        ),
+    )
+
+
+class PracticeEvent(db.Model):
+    """
+    Append-only record of the practice responses Siyavula served a user, one row per
+    proxied activity call
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    # create, answer, next or retry
+    action = db.Column(db.String(10), nullable=False)
+    # Only known for create, other events are linked to it by activity_id
+    section_id = db.Column(db.Integer)
+    activity_id = db.Column(db.String(36), nullable=False)
+    response_id = db.Column(db.String(36), nullable=False)
+    template_id = db.Column(db.Integer)
+    complete = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    __table_args__ = (
+        # Per-learner progress, and per-course progress joined on user_id
+        db.Index("ix_practice_event_user_id_created_at", "user_id", "created_at"),
+        db.Index("ix_practice_event_activity_id", "activity_id"),
+    )
+
+
+class TableVersion(db.Model):
+    """
+    Change counter of a table, bumped by every transaction that writes to it
+    """
+
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp())
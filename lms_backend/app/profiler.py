@@ -0,0 +1,112 @@
+from typing import Dict, List
+import json
+import logging
+import time
+
+from flask import Flask, g, has_request_context, request
+
+from lms_backend.app.db import observe_queries
+
+logger = logging.getLogger(__name__)
+
+
+class QueryProfile:
+    """
+    Count and total time of every distinct SQL statement executed by one request.
+    Statements are keyed by their parameterised text, so the same query run for
+    different ids counts as a repeat.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        # statement -> [count, seconds]
+        self.statements: Dict[str, List] = {}
+
+    def record(self, statement: str, seconds: float):
+        stats = self.statements.get(statement)
+        if stats is None:
+            self.statements[statement] = [1, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+
+    @property
+    def queries(self) -> int:
+        return sum(count for count, _ in self.statements.values())
+
+    @property
+    def db_time(self) -> float:
+        return sum(seconds for _, seconds in self.statements.values())
+
+    def repeated(self, threshold: int) -> List[Dict]:
+        """
+        Statements executed at least `threshold` times, the usual sign of an N+1 query
+        """
+        return [
+            {
+                "statement": " ".join(statement.split())[:200],
+                "count": count,
+                "ms": round(seconds * 1000, 2),
+            }
+            for statement, (count, seconds) in self.statements.items()
+            if count >= threshold
+        ]
+
+
+def init_profiler(app: Flask):
+    """
+    Profiles the SQL statements of each request when SQL_PROFILER_ENABLED is set: adds a
+    Server-Timing header and logs one JSON line per request, flagging repeated statements.
+    """
+    if not app.config["SQL_PROFILER_ENABLED"]:
+        return
+    threshold = app.config["SQL_PROFILER_REPEAT_THRESHOLD"]
+    # Our lines propagate to the app logger, on which Flask installs a stderr handler on
+    # first use. Unless logging is configured, the level would be WARNING, dropping the
+    # per-request INFO lines.
+    app.logger.debug("SQL profiler enabled")
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
+
+    @app.before_request
+    def start_profile():
+        g.query_profile = QueryProfile()
+
+    @app.after_request
+    def report_profile(response):
+        profile = g.pop("query_profile", None)
+        if profile is None:
+            return response
+        duration = time.perf_counter() - profile.started
+        queries, db_time = profile.queries, profile.db_time
+        repeated = profile.repeated(threshold)
+
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={db_time * 1000:.2f};desc="{queries} queries", '
+            f"app;dur={duration * 1000:.2f}",
+        )
+        logger.log(
+            logging.WARNING if repeated else logging.INFO,
+            json.dumps(
+                {
+                    "event": "sql_profile",
+                    "method": request.method,
+                    "path": request.path,
+                    "endpoint": request.endpoint,
+                    "status": response.status_code,
+                    "duration_ms": round(duration * 1000, 2),
+                    "queries": queries,
+                    "db_ms": round(db_time * 1000, 2),
+                    "repeated": repeated,
+                }
+            ),
+        )
+        return response
+
+    observe_queries(app, record_statement)
+
+
+def record_statement(statement: str, seconds: float):
+    if has_request_context() and "query_profile" in g:
+        g.query_profile.record(statement, seconds)
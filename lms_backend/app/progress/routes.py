@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import List, Optional
+from flask import jsonify
+from flask_openapi3 import Tag, APIBlueprint
+from pydantic import BaseModel
+from lms_backend.app.auth import auth
+from lms_backend.app.db import db
+from lms_backend.app.models import Course, User
+from lms_backend.app.progress.services import course_progress, user_progress
+from lms_backend.app.utils import json_response
+
+# Set tags for use in OpenAPI Swagger documentation
+progress_tag = Tag(name="progress", description="Practice progress")
+
+# Set Flask Blueprint
+progress_bp = APIBlueprint("progress", __name__, url_prefix="/progress")
+
+
+# Pydantic models
+class UserProgressPath(BaseModel):
+    user_id: int
+
+
+class CourseProgressPath(BaseModel):
+    course_id: int
+
+
+class ProgressSchema(BaseModel):
+    activities: int
+    questions: int
+    completed: int
+    last_practised_at: Optional[datetime] = None
+
+
+class SectionProgressSchema(ProgressSchema):
+    section_id: int
+
+
+class UserProgressSchema(ProgressSchema):
+    user_id: int
+    sections: List[SectionProgressSchema]
+
+
+class LearnerProgressSchema(ProgressSchema):
+    user_id: int
+
+
+class CourseProgressSchema(BaseModel):
+    course_id: int
+    learners: List[LearnerProgressSchema]
+
+
+# Endpoints
+@progress_bp.get(
+    "/users/<int:user_id>",
+    tags=[progress_tag],
+    responses={200: UserProgressSchema, 404: {}},
+)
+@auth.login_required
+def get_user_progress(path: UserProgressPath):
+    """
+    A learner's practice progress, in total and per section, from the recorded
+    Siyavula responses
+    """
+    if not db.session.get(User, path.user_id):
+        return jsonify({"message": "User with this id does not exist"}), 404
+
+    return json_response(UserProgressSchema, user_progress(path.user_id))
+
+
+@progress_bp.get(
+    "/courses/<int:course_id>",
+    tags=[progress_tag],
+    responses={200: CourseProgressSchema, 404: {}},
+)
+@auth.login_required
+def get_course_progress(path: CourseProgressPath):
+    """
+    Practice progress of every learner assigned to a course
+    """
+    if not db.session.get(Course, path.course_id):
+        return jsonify({"message": "Course with this id does not exist"}), 404
+
+    return json_response(
+        CourseProgressSchema,
+        {"course_id": path.course_id, "learners": course_progress(path.course_id)},
+    )
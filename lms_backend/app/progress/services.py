@@ -0,0 +1,229 @@
+from typing import Dict, Iterator, List, Optional
+import json
+import logging
+import queue
+import threading
+import time
+
+import httpx
+from flask import Flask, current_app
+from sqlalchemy import case, distinct, func, insert, select
+
+from lms_backend.app.db import db
+from lms_backend.app.models import PracticeEvent, UserCourse
+
+PROGRESS_EXTENSION = "practice_progress_recorder"
+# Larger streamed bodies are passed on without being recorded
+MAX_RECORDED_BODY = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def practice_event(
+    practice: Dict, body: bytes, content_encoding: Optional[str] = None
+) -> Optional[Dict]:
+    """
+    The PracticeEvent row of a Siyavula practice response, or None if the body is not
+    one. `practice` holds the user_id, action and section_id of the request.
+    """
+    try:
+        if content_encoding:
+            # Decoded as httpx does, for bodies streamed still encoded
+            headers = {"Content-Encoding": content_encoding}
+            body = httpx.Response(200, headers=headers, content=body).read()
+        data = json.loads(body)
+        activity, response = data["activity"], data["response"]
+        return {
+            **practice,
+            "activity_id": str(activity["id"]),
+            "response_id": str(response["id"]),
+            "template_id": response.get("template_id"),
+            "complete": bool(response.get("complete")),
+        }
+    except (httpx.DecodingError, KeyError, TypeError, ValueError):
+        return None
+
+
+class ProgressRecorder:
+    """
+    Writes practice events to the database from a background thread, in batches, so
+    that recording them adds no database round trip to the practice requests
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        batch_size: int = 100,
+        flush_interval: float = 1,
+        queue_size: int = 1000,
+    ) -> None:
+        """
+        Initialise the recorder, its thread starts with the first event
+            app: the app whose database is written to
+            batch_size: events inserted per statement
+            flush_interval: seconds an event may wait for its batch to fill
+            queue_size: events that may wait to be written, further ones are dropped
+        """
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def start(self):
+        # A thread does not survive a fork, so a forked server worker starts its own
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="practice-progress", daemon=True
+                )
+                self._thread.start()
+
+    def record(
+        self, practice: Dict, body: bytes, content_encoding: Optional[str] = None
+    ):
+        """
+        Queues a practice response to be parsed and written
+        """
+        self.start()
+        try:
+            self._queue.put_nowait((practice, body, content_encoding))
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Practice progress queue is full, event dropped")
+
+    def flush(self):
+        """
+        Waits until every queued event is written
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def _next_batch(self) -> List:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                rows = [row for row in (practice_event(*item) for item in batch) if row]
+                if rows:
+                    with self.app.app_context():
+                        db.session.execute(insert(PracticeEvent), rows)
+                        db.session.commit()
+            except Exception:
+                logger.exception("Failed to write %s practice events", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+def get_progress_recorder() -> Optional[ProgressRecorder]:
+    return current_app.extensions.get(PROGRESS_EXTENSION)
+
+
+def record_practice_stream(
+    chunks: Iterator[bytes],
+    recorder: ProgressRecorder,
+    practice: Dict,
+    content_encoding: Optional[str],
+) -> Iterator[bytes]:
+    """
+    Passes a streamed body on, recording it once it was sent in full
+    """
+    body = bytearray()
+    for chunk in chunks:
+        if len(body) <= MAX_RECORDED_BODY:
+            body += chunk
+        yield chunk
+    if len(body) <= MAX_RECORDED_BODY:
+        recorder.record(practice, bytes(body), content_encoding)
+
+
+def progress_columns():
+    """
+    Aggregates of a group of practice events: activities started, questions served and
+    questions completed, and the time of the last one
+    """
+    return (
+        func.count(distinct(PracticeEvent.activity_id)).label("activities"),
+        func.count(distinct(PracticeEvent.response_id)).label("questions"),
+        func.count(
+            distinct(case((PracticeEvent.complete, PracticeEvent.response_id)))
+        ).label("completed"),
+        func.max(PracticeEvent.created_at).label("last_practised_at"),
+    )
+
+
+def user_progress(user_id: int) -> Dict:
+    """
+    A learner's practice totals, and per section practised
+    """
+    totals = db.session.execute(
+        select(*progress_columns()).where(PracticeEvent.user_id == user_id)
+    ).one()
+
+    # Sections are only recorded on create, other events share its activity_id
+    activities = (
+        select(PracticeEvent.activity_id, PracticeEvent.section_id)
+        .where(PracticeEvent.user_id == user_id, PracticeEvent.action == "create")
+        .distinct()
+        .subquery()
+    )
+    sections = db.session.execute(
+        select(activities.c.section_id, *progress_columns())
+        .join(activities, activities.c.activity_id == PracticeEvent.activity_id)
+        .where(PracticeEvent.user_id == user_id)
+        .group_by(activities.c.section_id)
+        .order_by(activities.c.section_id)
+    ).all()
+    return {"user_id": user_id, **totals._asdict(), "sections": sections}
+
+
+def course_progress(course_id: int) -> List:
+    """
+    Practice totals of every learner assigned to the course, including those who have
+    not practised yet
+    """
+    return db.session.execute(
+        select(UserCourse.user_id, *progress_columns())
+        .outerjoin(PracticeEvent, PracticeEvent.user_id == UserCourse.user_id)
+        .where(UserCourse.course_id == course_id)
+        .group_by(UserCourse.user_id)
+        .order_by(UserCourse.user_id)
+    ).all()
+
+
+def init_progress(app: Flask):
+    """
+    Sets up the practice progress recorder when PRACTICE_PROGRESS_ENABLED is set
+    """
+    config = app.config
+    if not config["PRACTICE_PROGRESS_ENABLED"]:
+        return
+    app.extensions[PROGRESS_EXTENSION] = ProgressRecorder(
+        app,
+        batch_size=config["PRACTICE_PROGRESS_BATCH_SIZE"],
+        flush_interval=config["PRACTICE_PROGRESS_FLUSH_INTERVAL"],
+        queue_size=config["PRACTICE_PROGRESS_QUEUE_SIZE"],
+    )
+
+
+def flush_progress(app: Flask):
+    recorder = app.extensions.get(PROGRESS_EXTENSION)
+    if recorder is not None:
+        recorder.flush()
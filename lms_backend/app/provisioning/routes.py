@@ -0,0 +1,76 @@
+from datetime import datetime
+from typing import Optional
+from flask import current_app, jsonify
+from flask_openapi3 import Tag, APIBlueprint
+from pydantic import BaseModel
+from sqlalchemy import select
+from lms_backend.app.auth import auth
+from lms_backend.app.db import db
+from lms_backend.app.models import ProvisioningJob
+from lms_backend.app.provisioning.services import provisioning_counts
+from lms_backend.app.utils import json_response
+
+# Set tags for use in OpenAPI Swagger documentation
+provisioning_tag = Tag(
+    name="provisioning", description="Background Siyavula account creation"
+)
+
+# Set Flask Blueprint
+provisioning_bp = APIBlueprint("provisioning", __name__, url_prefix="/provisioning")
+
+
+# Pydantic models
+class ProvisioningPath(BaseModel):
+    user_id: int
+
+
+class ProvisioningSummarySchema(BaseModel):
+    enabled: bool
+    pending: int
+    running: int
+    done: int
+    failed: int
+
+
+class ProvisioningJobSchema(BaseModel):
+    user_id: int
+    status: str
+    attempts: int
+    next_attempt_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+
+# Endpoints
+@provisioning_bp.get(
+    "", tags=[provisioning_tag], responses={200: ProvisioningSummarySchema}
+)
+@auth.login_required
+def get_provisioning_summary():
+    """
+    Number of Siyavula account provisioning jobs in each status
+    """
+    response_instance = ProvisioningSummarySchema(
+        enabled=current_app.config["SIAVULA_PROVISIONING_ENABLED"],
+        **provisioning_counts(),
+    )
+    return jsonify(response_instance.model_dump()), 200
+
+
+@provisioning_bp.get(
+    "/<int:user_id>",
+    tags=[provisioning_tag],
+    responses={200: ProvisioningJobSchema, 404: {}},
+)
+@auth.login_required
+def get_provisioning_job(path: ProvisioningPath):
+    """
+    Siyavula account provisioning status of a user
+    """
+    job = db.session.execute(
+        select(ProvisioningJob).where(ProvisioningJob.user_id == path.user_id)
+    ).scalar()
+    if job is None:
+        return jsonify({"message": "No provisioning job for this user"}), 404
+
+    return json_response(ProvisioningJobSchema, job)
@@ -0,0 +1,274 @@
+from datetime import timedelta
+from typing import Dict, Iterable, Optional, Tuple
+import logging
+import threading
+
+from flask import Flask, current_app, g
+from sqlalchemy import and_, func, or_, select, update
+
+from lms_backend.app.db import db, insert_ignoring_conflicts
+from lms_backend.app.models import ProvisioningJob, User
+from lms_backend.app.siyavula.services import SiyavulaUserAPI, instantiate_siyavula
+from lms_backend.app.utils import utcnow
+
+PROVISIONING_EXTENSION = "siyavula_provisioning"
+JOB_STATUSES = ("pending", "running", "done", "failed")
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_provisioning(user_ids: Iterable[int]):
+    """
+    Adds a provisioning job per user, in the caller's transaction, when provisioning is
+    enabled. Call wake_provisioning() once it is committed.
+    """
+    if not current_app.config["SIAVULA_PROVISIONING_ENABLED"]:
+        return
+    now = utcnow()
+    rows = [
+        {"user_id": user_id, "status": "pending", "next_attempt_at": now}
+        for user_id in user_ids
+    ]
+    if rows:
+        db.session.execute(
+            insert_ignoring_conflicts(ProvisioningJob, ["user_id"]), rows
+        )
+
+
+def wake_provisioning():
+    """
+    Tells the current app's provisioning worker that jobs are due
+    """
+    worker = current_app.extensions.get(PROVISIONING_EXTENSION)
+    if worker is not None:
+        worker.wake()
+
+
+def provisioning_counts() -> Dict[str, int]:
+    """
+    Number of jobs in each status
+    """
+    counts = dict(
+        db.session.execute(
+            select(ProvisioningJob.status, func.count()).group_by(
+                ProvisioningJob.status
+            )
+        ).all()
+    )
+    return {status: counts.get(status, 0) for status in JOB_STATUSES}
+
+
+class ProvisioningWorker:
+    """
+    Creates the Siyavula accounts, and warms the user tokens, of queued users on a
+    bounded pool of threads. Jobs live in the database: they are claimed with a
+    conditional UPDATE, so every process may run a worker, and jobs left running by a
+    stopped process are picked up again after `stale_after` seconds.
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        workers: int = 4,
+        max_attempts: int = 5,
+        retry_backoff: float = 10,
+        poll_interval: float = 5,
+        stale_after: float = 120,
+    ) -> None:
+        """
+        Initialise the worker, its threads start on first wake()
+            app: the app whose database and Siyavula settings are used
+            workers: jobs run at once
+            max_attempts: attempts before a job is marked failed
+            retry_backoff: delay before the first retry, doubled for each further one
+            poll_interval: seconds between looks for due jobs when idle
+            stale_after: seconds after which a running job is considered abandoned
+        """
+        self.app = app
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._threads = []
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Starts the threads, unless they are running. Threads do not survive a fork, so
+        this also restarts them in a forked server worker.
+        """
+        if self._threads and all(thread.is_alive() for thread in self._threads):
+            return
+        with self._lock:
+            if self._threads and all(thread.is_alive() for thread in self._threads):
+                return
+            self._stopping.clear()
+            self._threads = [
+                threading.Thread(
+                    target=self._run, name=f"siyavula-provisioning-{i}", daemon=True
+                )
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stops the threads once their current job is done
+        """
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    job = self.claim()
+                    if job:
+                        # Another thread may take the next due job
+                        self._wake.set()
+                        self.run(*job)
+                        continue
+            except Exception:
+                logger.exception("Siyavula provisioning failed")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def claim(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Marks the next due job as running.
+        Returns its id, user id and attempt number, or None if no job is due.
+        """
+        now = utcnow()
+        due = or_(
+            and_(
+                ProvisioningJob.status == "pending",
+                ProvisioningJob.next_attempt_at <= now,
+            ),
+            and_(
+                ProvisioningJob.status == "running",
+                ProvisioningJob.claimed_at < now - timedelta(seconds=self.stale_after),
+            ),
+        )
+        while True:
+            job = db.session.execute(
+                select(
+                    ProvisioningJob.id,
+                    ProvisioningJob.user_id,
+                    ProvisioningJob.attempts,
+                )
+                .where(due)
+                .order_by(ProvisioningJob.next_attempt_at)
+                .limit(1)
+            ).first()
+            if job is None:
+                db.session.commit()
+                return None
+            # Attempts only grow, so they tell whether another worker claimed the job first
+            result = db.session.execute(
+                update(ProvisioningJob)
+                .where(
+                    ProvisioningJob.id == job.id,
+                    ProvisioningJob.attempts == job.attempts,
+                    due,
+                )
+                .values(status="running", attempts=job.attempts + 1, claimed_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return job.id, job.user_id, job.attempts + 1
+
+    def run(self, job_id: int, user_id: int, attempt: int):
+        """
+        Creates the user's Siyavula account and fetches a user token, which stays cached
+        in this process
+        """
+        if db.session.get(User, user_id) is None:
+            # Retrying will not help
+            self.finish(job_id, attempt, "failed", "User does not exist")
+            return
+        try:
+            if not getattr(g, "siavula_api", None):
+                instantiate_siyavula()
+            SiyavulaUserAPI(
+                api=g.siavula_api, user_id=user_id
+            ).get_or_create_user_token()
+        except Exception as exc:
+            db.session.rollback()
+            logger.warning(
+                "Siyavula provisioning of user %s failed (attempt %s)",
+                user_id,
+                attempt,
+                exc_info=True,
+            )
+            if attempt >= self.max_attempts:
+                self.finish(job_id, attempt, "failed", repr(exc))
+            else:
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                self.finish(job_id, attempt, "pending", repr(exc), delay)
+        else:
+            self.finish(job_id, attempt, "done")
+
+    def finish(
+        self,
+        job_id: int,
+        attempt: int,
+        status: str,
+        error: Optional[str] = None,
+        retry_in: float = 0,
+    ):
+        """
+        Records the outcome of our attempt, unless the job was taken over meanwhile
+        """
+        now = utcnow()
+        values = {"status": status, "last_error": error and error[:200]}
+        if status == "pending":
+            values["next_attempt_at"] = now + timedelta(seconds=retry_in)
+        else:
+            values["finished_at"] = now
+        db.session.execute(
+            update(ProvisioningJob)
+            .where(ProvisioningJob.id == job_id, ProvisioningJob.attempts == attempt)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+
+def init_provisioning(app: Flask):
+    """
+    Sets up the provisioning worker when SIAVULA_PROVISIONING_ENABLED is set. Its threads
+    start with the first request, so a preloading server starts them in each worker
+    rather than in the master process.
+    """
+    config = app.config
+    if not config["SIAVULA_PROVISIONING_ENABLED"]:
+        return
+    worker = ProvisioningWorker(
+        app,
+        workers=config["SIAVULA_PROVISIONING_WORKERS"],
+        max_attempts=config["SIAVULA_PROVISIONING_MAX_ATTEMPTS"],
+        retry_backoff=config["SIAVULA_PROVISIONING_RETRY_BACKOFF"],
+        poll_interval=config["SIAVULA_PROVISIONING_POLL_INTERVAL"],
+        stale_after=config["SIAVULA_PROVISIONING_STALE_AFTER"],
+    )
+    app.extensions[PROVISIONING_EXTENSION] = worker
+    app.before_request(worker.start)
+
+
+def stop_provisioning(app: Flask, timeout: Optional[float] = None):
+    worker = app.extensions.get(PROVISIONING_EXTENSION)
+    if worker is not None:
+        worker.stop(timeout)
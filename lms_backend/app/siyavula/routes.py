@@ -1,12 +1,24 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+import math
 from uuid import UUID
-from flask import Response, jsonify
+import httpx
+from flask import Response, jsonify, request
 from flask_openapi3 import Tag, APIBlueprint
-from pydantic import BaseModel
-from lms_backend.app.auth import basic_auth
-from lms_backend.app.models import User
-from lms_backend.app.siyavula.services import SiyavulaUserAPI, depends_on_siyavula_api
-from flask import g
+from pydantic import BaseModel, Field
+from lms_backend.app.auth import auth
+from lms_backend.app.progress.services import (
+    get_progress_recorder,
+    record_practice_stream,
+)
+from lms_backend.app.siyavula.services import (
+    SiyavulaUnavailable,
+    SiyavulaUserAPI,
+    configured_siyavula_api,
+    depends_on_siyavula_api,
+    siyavula_curricula,
+)
+from lms_backend.app.siyavula.toc import get_toc_cache
+from flask import current_app, g
 
 # Set tags for use in OpenAPI Swagger documentation
 siyavula_tag = Tag(name="siyavula", description="Siyavula API")
@@ -52,93 +64,217 @@ class SiyavulaPracticeRequest(BaseModel):
     user_id: int
 
 
+class SiyavulaTocQuery(BaseModel):
+    grade: int = Field(ge=1, le=12)
+    subject: str = Field("maths", pattern=r"^[a-z_]+$")
+    region: Optional[str] = Field(
+        None,
+        description="Defaults to the configured region, else one of SIAVULA_EXTRA_CURRICULA",
+    )
+    curriculum: Optional[str] = Field(
+        None,
+        description="Defaults to the configured curriculum, else one of SIAVULA_EXTRA_CURRICULA",
+    )
+
+
+# Upstream headers passed on when streaming a Siyavula response
+STREAMED_HEADERS = (
+    "Content-Encoding",
+    "Content-Length",
+    "Cache-Control",
+    "ETag",
+    "Expires",
+    "Last-Modified",
+    "Vary",
+)
+
+
+def proxy_response(
+    siyavula_response: httpx.Response, practice: Optional[Dict] = None
+) -> Response:
+    """
+    Pass a Siyavula response through to our client.
+    An unread (streamed) response is passed on chunk by chunk, still encoded with an
+    encoding our client accepted, and the upstream connection is released once our
+    client has received it.
+    A successful response is recorded as progress of the `practice` request, which
+    holds its user_id, action and section_id.
+    """
+    recorder = get_progress_recorder()
+    if not practice or not siyavula_response.is_success:
+        recorder = None
+
+    if siyavula_response.is_closed:
+        if recorder:
+            recorder.record(practice, siyavula_response.content)
+        return Response(
+            siyavula_response.content,
+            status=siyavula_response.status_code,
+            content_type=siyavula_response.headers.get("Content-Type"),
+        )
+
+    headers = {
+        name: siyavula_response.headers[name]
+        for name in STREAMED_HEADERS
+        if name in siyavula_response.headers
+    }
+    chunks = siyavula_response.iter_raw()
+    if recorder:
+        content_encoding = siyavula_response.headers.get("Content-Encoding")
+        chunks = record_practice_stream(chunks, recorder, practice, content_encoding)
+    flask_response = Response(
+        chunks,
+        status=siyavula_response.status_code,
+        headers=headers,
+        content_type=siyavula_response.headers.get("Content-Type"),
+    )
+    flask_response.call_on_close(siyavula_response.close)
+    return flask_response
+
+
+def siyavula_unavailable(error: SiyavulaUnavailable):
+    """
+    Fail fast with a 503 while Siyavula is unreachable or failing
+    """
+    response = jsonify({"message": str(error)})
+    response.status_code = 503
+    if error.retry_after:
+        response.headers["Retry-After"] = str(math.ceil(error.retry_after))
+    return response
+
+
+siyavula_bp.register_error_handler(SiyavulaUnavailable, siyavula_unavailable)
+
+
+def toc_response(query: SiyavulaTocQuery) -> Response:
+    """
+    The cached table of contents, with an ETag and a max-age of its remaining lifetime,
+    or a 304 if our client has it already
+    """
+    config = current_app.config
+    pair = (
+        query.region or config["SIAVULA_API_CLIENT_REGION"],
+        query.curriculum or config["SIAVULA_API_CLIENT_CURRICULUM"],
+    )
+    if pair not in siyavula_curricula(config):
+        return jsonify({"message": "Unsupported region and curriculum"}), 400
+    api = configured_siyavula_api(*pair)
+    try:
+        entry = get_toc_cache().get(api, query.subject, query.grade)
+    except LookupError as exc:
+        return jsonify({"message": str(exc)}), 404
+
+    response = Response(entry.body, mimetype="application/json")
+    response.set_etag(entry.etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = max(
+        0, int(current_app.config["SIAVULA_TOC_TTL"] - entry.age())
+    )
+    return response.make_conditional(request)
+
+
+@siyavula_bp.get(
+    "/toc", tags=[siyavula_tag], responses={200: {}, 304: {}, 400: {}, 404: {}}
+)
+@auth.login_required
+def get_toc(query: SiyavulaTocQuery):
+    """
+    Siyavula's table of contents for a grade, listing the section ids to practise
+    """
+    return toc_response(query)
+
+
 @siyavula_bp.post("/activity", tags=[siyavula_tag], responses={200: SiyavulaModel})
-@basic_auth.login_required
+@auth.login_required
 @depends_on_siyavula_api
 def create_activity(body: SiyavulaPracticeRequest):
     """
     Create a practice activity
     """
-    # Check if user exists
-    if not User.query.filter_by(id=body.user_id).first():
+    try:
+        api = SiyavulaUserAPI(
+            api=g.siavula_api,
+            user_id=body.user_id,
+            stream=current_app.config["SIAVULA_STREAM_RESPONSES"],
+        )
+    except ValueError:
         return jsonify({"message": "User with this id does not exist"}), 400
 
-    api = SiyavulaUserAPI(client_token=g.siavula_api.client_token, user_id=body.user_id)
-
     siyavula_response = api.create_practice_activity(section_id=body.section_id)
 
-    flask_response = Response(
-        siyavula_response.content,
-        status=siyavula_response.status_code,
-        content_type=siyavula_response.headers.get("Content-Type"),
+    return proxy_response(
+        siyavula_response,
+        {"user_id": body.user_id, "action": "create", "section_id": body.section_id},
     )
-    return flask_response
 
 
 @siyavula_bp.post(
     "/activity/answer", tags=[siyavula_tag], responses={200: SiyavulaModel}
 )
-@basic_auth.login_required
+@auth.login_required
 @depends_on_siyavula_api
 def practice_submit_answer(body: SiyavulaCreateAnswersModel):
     """
     Submit a student's answers for marking
     """
 
-    api = SiyavulaUserAPI(client_token=g.siavula_api.client_token, user_id=body.user_id)
+    api = SiyavulaUserAPI(
+        api=g.siavula_api,
+        user_id=body.user_id,
+        stream=current_app.config["SIAVULA_STREAM_RESPONSES"],
+    )
     siyavula_response = api.practice_submit_answer(
         activity_uuid=body.activity_uuid,
         response_uuid=body.response_uuid,
         form_data=body.answers,
     )
 
-    flask_response = Response(
-        siyavula_response.content,
-        status=siyavula_response.status_code,
-        content_type=siyavula_response.headers.get("Content-Type"),
+    return proxy_response(
+        siyavula_response, {"user_id": body.user_id, "action": "answer"}
     )
-    return flask_response
 
 
 @siyavula_bp.post("/activity/next", tags=[siyavula_tag], responses={200: SiyavulaModel})
-@basic_auth.login_required
+@auth.login_required
 @depends_on_siyavula_api
 def practice_next(body: SiyavulaCreateModel):
     """
     Next question
     """
 
-    api = SiyavulaUserAPI(client_token=g.siavula_api.client_token, user_id=body.user_id)
+    api = SiyavulaUserAPI(
+        api=g.siavula_api,
+        user_id=body.user_id,
+        stream=current_app.config["SIAVULA_STREAM_RESPONSES"],
+    )
     siyavula_response = api.practice_next_question(
         activity_uuid=body.activity_uuid, response_uuid=body.response_uuid
     )
 
-    flask_response = Response(
-        siyavula_response.content,
-        status=siyavula_response.status_code,
-        content_type=siyavula_response.headers.get("Content-Type"),
+    return proxy_response(
+        siyavula_response, {"user_id": body.user_id, "action": "next"}
     )
-    return flask_response
 
 
 @siyavula_bp.post(
     "/activity/retry", tags=[siyavula_tag], responses={200: SiyavulaModel}
 )
-@basic_auth.login_required
+@auth.login_required
 @depends_on_siyavula_api
 def practice_retry(body: SiyavulaCreateModel):
     """
     Retry the activity.
     """
 
-    api = SiyavulaUserAPI(client_token=g.siavula_api.client_token, user_id=body.user_id)
+    api = SiyavulaUserAPI(
+        api=g.siavula_api,
+        user_id=body.user_id,
+        stream=current_app.config["SIAVULA_STREAM_RESPONSES"],
+    )
     siyavula_response = api.practice_retry(
         activity_uuid=body.activity_uuid, response_uuid=body.response_uuid
     )
 
-    flask_response = Response(
-        siyavula_response.content,
-        status=siyavula_response.status_code,
-        content_type=siyavula_response.headers.get("Content-Type"),
+    return proxy_response(
+        siyavula_response, {"user_id": body.user_id, "action": "retry"}
     )
-    return flask_response
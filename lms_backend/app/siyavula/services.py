@@ -1,19 +1,121 @@
-from typing import Dict
+from importlib.util import find_spec
+from typing import Dict, List, Optional, Tuple
+import atexit
+import base64
+import json
+import random
+import threading
+import time
 import httpx
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm.attributes import set_committed_value
 
-from lms_backend.app.config import Config
+from lms_backend.app.cache import SingleFlight, TTLCache
+from lms_backend.app.metrics import observe_upstream, upstream_operation
+from lms_backend.app.siyavula.transport import create_transport
 from lms_backend.app.models import User
 from lms_backend.app.db import db
 from lms_backend.app.utils import is_valid_uuid
-from flask import g
+from flask import Flask, current_app, g, has_app_context, has_request_context, request
 import logging
 import secrets
 from functools import wraps
 
 
+# Default root of the Siyavula API, see SIAVULA_API_BASE_URL
+SIYAVULA_API_URL = "https://www.siyavula.com/api/siyavula/v1"
+
+HTTP_CLIENT_EXTENSION = "siyavula_http_client"
+_http_client_lock = threading.Lock()
+
+
+def http_client_options(config) -> Dict:
+    """
+    Connection pool, timeout and protocol settings shared by the Siyavula HTTP clients.
+    HTTP/2 is used when enabled and the optional `h2` package is installed.
+    """
+    return {
+        "limits": httpx.Limits(
+            max_connections=config["SIAVULA_HTTP_MAX_CONNECTIONS"],
+            max_keepalive_connections=config["SIAVULA_HTTP_MAX_KEEPALIVE_CONNECTIONS"],
+            keepalive_expiry=config["SIAVULA_HTTP_KEEPALIVE_EXPIRY"],
+        ),
+        "timeout": httpx.Timeout(
+            config["SIAVULA_HTTP_READ_TIMEOUT"],
+            connect=config["SIAVULA_HTTP_CONNECT_TIMEOUT"],
+        ),
+        "http2": config["SIAVULA_HTTP2"] and find_spec("h2") is not None,
+    }
+
+
+class MetricsTransport(httpx.BaseTransport):
+    """
+    Records the latency and status of every Siyavula call, by operation
+    """
+
+    def __init__(self, transport: httpx.BaseTransport) -> None:
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = self.transport.handle_request(request)
+        except httpx.TransportError as exc:
+            observe_upstream(request.url.path, started, type(exc).__name__)
+            raise
+        observe_upstream(request.url.path, started, response.status_code)
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+def create_http_client(
+    config, transport: Optional[httpx.BaseTransport] = None
+) -> httpx.Client:
+    """
+    Creates the pooled, keep-alive HTTP client used for all Siyavula traffic.
+    Requests go through `transport` when given, else through the transport of
+    SIAVULA_TRANSPORT_MODE: the network, recorded to a cassette, or replayed from one.
+    """
+    options = http_client_options(config)
+    limits, http2 = options.pop("limits"), options.pop("http2")
+    if transport is None:
+        transport = create_transport(
+            config, lambda: httpx.HTTPTransport(limits=limits, http2=http2)
+        )
+    return httpx.Client(transport=MetricsTransport(transport), **options)
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Returns the current app's Siyavula HTTP client, creating it on first use so that
+    app startup does not pay for the transport and TLS setup
+    """
+    client = current_app.extensions.get(HTTP_CLIENT_EXTENSION)
+    if client is None:
+        with _http_client_lock:
+            client = current_app.extensions.get(HTTP_CLIENT_EXTENSION)
+            if client is None:
+                client = create_http_client(current_app.config)
+                current_app.extensions[HTTP_CLIENT_EXTENSION] = client
+                atexit.register(client.close)
+    return client
+
+
+def release_http_clients(app: Flask, close: bool = True):
+    """
+    Drops the app's Siyavula HTTP client so that it is recreated on next use.
+    After a fork pass close=False: the sockets belong to the parent process.
+    """
+    client = app.extensions.pop(HTTP_CLIENT_EXTENSION, None)
+    if client is not None and close:
+        client.close()
+
+
 def depends_on_siyavula_api(f):
     """
-    Decorator that checks if the Siyavula API client is available in g
+    Decorator that makes the shared Siyavula API client available in g
     """
 
     @wraps(f)
@@ -25,74 +127,581 @@ def depends_on_siyavula_api(f):
     return wrapper
 
 
+class SiyavulaUnavailable(Exception):
+    """
+    Siyavula could not be reached, kept failing, or is skipped while the circuit is open.
+    Served as a 503 by the Siyavula blueprints.
+    """
+
+    def __init__(self, message: str, retry_after: float = 0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while Siyavula is unhealthy. The circuit opens after
+    `failure_threshold` consecutive failures; after `reset_timeout` seconds a single
+    trial call is let through, which closes it again on success.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._trial or time.monotonic() < self._opened_at + self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def before_call(self):
+        """
+        Raises SiyavulaUnavailable unless the call may go ahead
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self._trial:
+                raise SiyavulaUnavailable(
+                    "Siyavula is unavailable, please try again later",
+                    retry_after=max(remaining, 1),
+                )
+            # Half-open: this caller makes the trial call
+            self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+# Upstream statuses worth retrying a read-only request for
+RETRYABLE_STATUSES = {502, 503, 504}
+# Operations that change nothing upstream, as named by upstream_operation(). Creating an
+# activity or moving to the next question are GETs too, but Siyavula may have acted on
+# a request that timed out or got a 502-504, so they are not retried.
+READ_ONLY_OPERATIONS = ("user token", "toc")
+# Errors raised before a request reached Siyavula, which any request may be retried after
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Operations that exchange tokens or accounts, as named by upstream_operation()
+TOKEN_OPERATIONS = ("get-token", "user token", "create user")
+PRACTICE_OPERATIONS = (
+    "create practice activity",
+    "submit-answer",
+    "next question",
+    "retry",
+)
+
+
+def operation_timeouts(config) -> Dict[str, httpx.Timeout]:
+    """
+    Timeouts of each Siyavula operation: token and account calls are expected to be
+    quick, practice calls render questions and get longer
+    """
+    connect = config["SIAVULA_HTTP_CONNECT_TIMEOUT"]
+    token = httpx.Timeout(config["SIAVULA_TOKEN_TIMEOUT"], connect=connect)
+    practice = httpx.Timeout(config["SIAVULA_PRACTICE_TIMEOUT"], connect=connect)
+    return {
+        **{operation: token for operation in TOKEN_OPERATIONS},
+        **{operation: practice for operation in PRACTICE_OPERATIONS},
+    }
+
+
+def raise_for_unavailable(response: httpx.Response, operation: str):
+    """
+    Token and account calls cannot be passed on to our client, so their failures are
+    reported as Siyavula being unavailable
+    """
+    if response.is_error:
+        raise SiyavulaUnavailable(
+            f"Siyavula {operation} failed with status {response.status_code}"
+        )
+
+
+# A Siyavula account being created is claimed with "pending:<unix time>:<nonce>" in
+# User.siyavula_account_id, so only one worker creates it
+PENDING_ACCOUNT_PREFIX = "pending:"
+
+
+def has_siyavula_account(user: User) -> bool:
+    account_id = user.siyavula_account_id
+    return bool(account_id) and not account_id.startswith(PENDING_ACCOUNT_PREFIX)
+
+
+def token_expiry(token: str, default_ttl: float) -> float:
+    """
+    Returns the monotonic time at which a Siyavula token expires.
+    Siyavula tokens are JWTs, so the `exp` claim is used when present, else `default_ttl`.
+    The signature is not verified, the token is only read to schedule a refresh.
+    """
+    ttl = default_ttl
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload))["exp"]
+        ttl = min(float(exp) - time.time(), default_ttl)
+    except (IndexError, KeyError, TypeError, ValueError):
+        pass
+    return time.monotonic() + ttl
+
+
 class SiyavulaAPI:
     """
     Class for managing Siyavula API
     """
 
-    def __init__(self, name: str, password: str, region: str, curriculum: str) -> None:
+    def __init__(
+        self,
+        name: str,
+        password: str,
+        region: str,
+        curriculum: str,
+        token_ttl: float = 3600,
+        refresh_margin: float = 60,
+        user_token_cache_size: int = 1024,
+        client: Optional[httpx.Client] = None,
+        base_url: str = SIYAVULA_API_URL,
+        timeouts: Optional[Dict[str, httpx.Timeout]] = None,
+        retries: int = 2,
+        retry_backoff: float = 0.1,
+        breaker: Optional[CircuitBreaker] = None,
+        account_claim_timeout: float = 30,
+    ) -> None:
         """
         Initialise the API
             name: the organisation name provided by Siyavula
             password: the password that was provided by Siyavula
             region: The country the template will be requested for
             curriculum: The curriculum the template will be requested for
+            token_ttl: Lifetime of the client token if it does not carry an expiry
+            refresh_margin: Seconds before expiry at which the token is refreshed in the background
+            user_token_cache_size: Number of user tokens kept, keyed by LMS user id
+            client: HTTP client to use, defaults to the current app's pooled client
+            base_url: Root of the Siyavula API, e.g. a local stand-in
+            timeouts: Timeout per operation, else the client's timeout
+            retries: Extra attempts of requests that did not reach Siyavula, and of
+                read-only requests that timed out or got a 502-504
+            retry_backoff: Base of the jittered exponential delay between attempts
+            breaker: Circuit breaker shared by all calls of this client
+            account_claim_timeout: Seconds after which another worker may take over a
+                Siyavula account creation that did not finish
         """
         self.name = name
         self.password = password
         self.region = region
         self.curriculum = curriculum
-        self.client_token = None
+        self.token_ttl = token_ttl
+        self.refresh_margin = refresh_margin
+        self._client = client
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = timeouts or {}
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.account_claim_timeout = account_claim_timeout
+        # Concurrent user token fetches and account creations for the same user share one call
+        self.flights = SingleFlight()
+        self._client_token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.user_tokens = TTLCache(maxsize=user_token_cache_size, ttl=token_ttl)
+
+        try:
+            self.get_client_token()
+        except SiyavulaUnavailable:
+            # Fetched again on first use, once Siyavula is reachable
+            logging.warning("Failed to fetch Siyavula client token", exc_info=True)
+
+    @property
+    def http_client(self) -> httpx.Client:
+        return self._client or get_http_client()
+
+    @property
+    def client_token(self) -> str:
+        """
+        The cached client token, fetched again once it has expired.
+        Close to expiry, the cached token is returned while a new one is fetched in the background.
+        """
+        now = time.monotonic()
+        if self._client_token is None or now >= self._expires_at:
+            with self._lock:
+                if self._client_token is None or time.monotonic() >= self._expires_at:
+                    self.get_client_token()
+            return self._client_token
+
+        token = self._client_token
+        if now >= self._expires_at - self.refresh_margin:
+            self._refresh_in_background()
+        return token
+
+    def invalidate_client_token(self, token: Optional[str] = None):
+        """
+        Drops the cached client token, e.g. after Siyavula rejected it with a 401.
+        When `token` is given it is only dropped if it is still the cached one, so
+        concurrent rejections of the same token lead to a single refetch.
+        """
+        with self._lock:
+            if token is not None and token != self._client_token:
+                return
+            self._client_token = None
+            self._expires_at = 0.0
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def refresh():
+            try:
+                if app:
+                    with app.app_context():
+                        self.get_client_token()
+                else:
+                    self.get_client_token()
+            except Exception:
+                logging.warning(
+                    "Failed to refresh Siyavula client token", exc_info=True
+                )
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def request_options(self, url: str, kwargs: Dict) -> Dict:
+        """
+        Request arguments with the operation's timeout, if it has one
+        """
+        timeout = self.timeouts.get(upstream_operation(httpx.URL(url).path))
+        return kwargs if timeout is None else {**kwargs, "timeout": timeout}
+
+    def retryable(
+        self,
+        url: str,
+        error: Optional[Exception] = None,
+        response: Optional[httpx.Response] = None,
+    ) -> bool:
+        """
+        Whether a request that failed with `error`, or got `response`, may be sent again
+        """
+        read_only = upstream_operation(httpx.URL(url).path) in READ_ONLY_OPERATIONS
+        if error is not None:
+            return read_only or isinstance(error, UNSENT_ERRORS)
+        return read_only and response.status_code in RETRYABLE_STATUSES
 
-        self.get_client_token()
+    def retry_delay(self, attempt: int) -> float:
+        # Full jitter: a random delay up to the exponential backoff, capped at 2 seconds
+        return random.uniform(0, min(2.0, self.retry_backoff * 2**attempt))
+
+    def send(
+        self, method: str, url: str, stream: bool = False, **kwargs
+    ) -> httpx.Response:
+        """
+        Sends a request to Siyavula through the circuit breaker, with the operation's timeout.
+        Requests are retried with a jittered backoff as retryable() allows.
+        A streamed response must be closed by the caller.
+        """
+        client = self.http_client
+        kwargs = self.request_options(url, kwargs)
+        for attempt in range(1 + self.retries):
+            last = attempt == self.retries
+            self.breaker.before_call()
+            request = client.build_request(method, url, **kwargs)
+            try:
+                response = client.send(request, stream=stream)
+            except httpx.HTTPError as exc:
+                self.breaker.record_failure()
+                if (
+                    not isinstance(exc, httpx.TransportError)
+                    or last
+                    or not self.retryable(url, error=exc)
+                ):
+                    raise SiyavulaUnavailable(
+                        f"Siyavula request failed: {type(exc).__name__}"
+                    ) from exc
+            except BaseException:
+                # Every outcome must be recorded, or a failed trial call leaves the circuit open
+                self.breaker.record_failure()
+                raise
+            else:
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if last or not self.retryable(url, response=response):
+                    return response
+                response.close()
+            time.sleep(self.retry_delay(attempt))
 
     def get_client_token(self):
         """
         Retrieves an authentication token to be used to authenticate us in subsequent requests
         """
-        url = "https://www.siyavula.com/api/siyavula/v1/get-token"
+        url = f"{self.base_url}/get-token"
         payload = {
             "name": self.name,
             "password": self.password,
             "region": self.region,
             "curriculum": self.curriculum,
         }
-        response = httpx.post(url, json=payload)
-        self.client_token = response.json()["token"]
+        response = self.send("POST", url, json=payload)
+        raise_for_unavailable(response, "get-token")
+        token = response.json()["token"]
+        self._expires_at = token_expiry(token, self.token_ttl)
+        self._client_token = token
+
+
+# Process-wide Siyavula API clients, keyed by (name, region, curriculum)
+_siyavula_apis: Dict[Tuple[str, str, str], SiyavulaAPI] = {}
+# Creating a client fetches its token, so only callers for the same key wait for it
+_siyavula_api_flights = SingleFlight()
+
+
+def get_siyavula_api(
+    name: str, password: str, region: str, curriculum: str, **kwargs
+) -> SiyavulaAPI:
+    """
+    Returns the shared Siyavula API client for these credentials, creating it on first use
+    """
+    key = (name, region, curriculum)
+
+    def create() -> SiyavulaAPI:
+        # Another flight may have created it since the check below
+        api = _siyavula_apis.get(key)
+        if api is None:
+            api = SiyavulaAPI(name, password, region, curriculum, **kwargs)
+            _siyavula_apis[key] = api
+        return api
+
+    api = _siyavula_apis.get(key)
+    if api is None:
+        api = _siyavula_api_flights.do(key, create)
+    return api
 
 
 class SiyavulaUserAPI:
-    def __init__(self, client_token: str, user_id: int) -> None:
-        self.client_token = client_token
-        self.user = User.query.filter_by(id=user_id).first()
+    def __init__(self, api: SiyavulaAPI, user_id: int, stream: bool = False) -> None:
+        """
+        Initialise the API for an LMS user
+            api: the shared Siyavula API client
+            user_id: the LMS user id
+            stream: return practice responses unread, so their body can be streamed to our client
+        """
+        self.api = api
+        self.stream = stream
+        self.user = db.session.get(User, user_id)
         if not self.user:
             raise ValueError("Unexpected User ID")
         self.user_token = None
+        self._sent_client_token = None
+
+    @property
+    def client_token(self) -> str:
+        return self.api.client_token
+
+    def _headers(self, user_auth: bool, stream: bool = False) -> Dict[str, str]:
+        self._sent_client_token = self.client_token
+        headers = {"JWT": self._sent_client_token}
+        if user_auth:
+            headers["Authorization"] = f"JWT {self.user_token}"
+        if stream:
+            # A streamed body reaches our client still encoded, so only ask for
+            # encodings our client accepts
+            headers["Accept-Encoding"] = (
+                request.headers.get("Accept-Encoding", "identity")
+                if has_request_context()
+                else "identity"
+            )
+        return headers
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        user_auth: bool = True,
+        stream: bool = False,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Sends a request to Siyavula, refreshing the tokens and retrying once if they were rejected.
+        A streamed response must be closed by the caller.
+        """
+        response = self.api.send(
+            method,
+            url,
+            stream=stream,
+            headers=self._headers(user_auth, stream),
+            **kwargs,
+        )
+        if response.status_code == 401:
+            response.close()
+            self._refresh_tokens(user_auth)
+            response = self.api.send(
+                method,
+                url,
+                stream=stream,
+                headers=self._headers(user_auth, stream),
+                **kwargs,
+            )
+        return response
+
+    def _refresh_tokens(self, user_auth: bool):
+        """
+        Drops the tokens Siyavula rejected, unless another request already replaced them,
+        and fetches new ones
+        """
+        self.api.invalidate_client_token(self._sent_client_token)
+        if user_auth:
+            if self.api.user_tokens.get(self.user.id) == self.user_token:
+                self.api.user_tokens.pop(self.user.id)
+            self.get_or_create_user_token()
 
     def get_or_create_user_token(self):
         """
-        Gets a user token if user exists on Siavula, else create user and get token
+        Gets a user token if user exists on Siavula, else create user and get token.
+        Tokens are reused from the cache until they expire, and concurrent requests for
+        the same user share a single fetch.
         """
-        if not self.user.siyavula_account_id:
+        self.user_token = self.api.user_tokens.get(self.user.id)
+        if self.user_token:
+            return
+
+        self.user_token = self.api.flights.do(
+            ("user token", self.user.id), self._fetch_user_token
+        )
+
+    def _fetch_user_token(self) -> str:
+        # A fetch that finished since the cache was checked may have stored it
+        token = self.api.user_tokens.get(self.user.id)
+        if token:
+            return token
+
+        if not has_siyavula_account(self.user):
             self.create_siavula_user_id()
 
-        self.get_user_token()
+        return self.get_user_token()
 
-    def get_user_token(self):
+    def get_user_token(self) -> str:
         """
         Retrieves an authentication token to authenticate a user
         """
-        url = f"https://www.siyavula.com/api/siyavula/v1/user/{self.user.id}/token"
-        headers = {"JWT": self.client_token}
-        response = httpx.get(url, headers=headers)
+        url = f"{self.api.base_url}/user/{self.user.id}/token"
+        response = self._request("GET", url, user_auth=False)
+        raise_for_unavailable(response, "user token")
         self.user_token = response.json()["token"]
+        self.api.user_tokens.set(
+            self.user.id,
+            self.user_token,
+            token_expiry(self.user_token, self.api.token_ttl),
+        )
+        return self.user_token
 
     def create_siavula_user_id(self):
         """
-        Create user on Siavula
+        Create user on Siavula.
+        The user row is claimed first, so that when several workers get here for the same
+        user only one creates the account and the others wait for it. Waiters poll the
+        row with a SELECT, and only try to claim it once it looks free or stale.
+        """
+        deadline = time.monotonic() + self.api.account_claim_timeout
+        while True:
+            account_id = self._load_account_id()
+            if has_siyavula_account(self.user):
+                return
+            if account_id is None or account_id < self._stale_claim():
+                claim = self._claim_account_creation()
+                if claim:
+                    break
+            if time.monotonic() >= deadline:
+                raise SiyavulaUnavailable(
+                    "Siyavula account creation is still in progress", retry_after=1
+                )
+            time.sleep(0.1)
+
+        try:
+            account_id = self._create_siyavula_account()
+        except BaseException:
+            self._set_account_id(claim, None)
+            raise
+        self._set_account_id(claim, account_id)
+
+    def _load_account_id(self) -> Optional[str]:
+        """
+        Reads the user's current account id or claim, without writing or flushing
+        anything, and keeps it on the user
+        """
+        with db.session.no_autoflush:
+            account_id = db.session.scalar(
+                select(User.siyavula_account_id).where(User.id == self.user.id)
+            )
+        set_committed_value(self.user, "siyavula_account_id", account_id)
+        return account_id
+
+    def _stale_claim(self) -> str:
+        # Claims are compared as strings, which orders them by time
+        stale = int(time.time()) - int(self.api.account_claim_timeout)
+        return f"{PENDING_ACCOUNT_PREFIX}{stale}"
+
+    def _claim_account_creation(self) -> Optional[str]:
+        """
+        Marks the user's account as being created, if it has none and no other worker is
+        creating it. Returns the claim, or None if the row could not be claimed.
+        The claim is committed for other workers to see, along with anything else the
+        session holds.
+        """
+        claim = f"{PENDING_ACCOUNT_PREFIX}{int(time.time())}:{secrets.token_hex(4)}"
+        stale = self._stale_claim()
+        account_id = User.siyavula_account_id
+        result = db.session.execute(
+            update(User)
+            .where(
+                User.id == self.user.id,
+                or_(
+                    account_id.is_(None),
+                    and_(
+                        account_id.startswith(PENDING_ACCOUNT_PREFIX),
+                        account_id < stale,
+                    ),
+                ),
+            )
+            .values(siyavula_account_id=claim)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return claim if result.rowcount == 1 else None
+
+    def _set_account_id(self, claim: str, account_id: Optional[str]):
         """
-        url = "https://www.siyavula.com/api/siyavula/v1/user"
-        headers = {"JWT": self.client_token}
+        Replaces our claim with the created account id, or releases it
+        """
+        db.session.execute(
+            update(User)
+            .where(User.id == self.user.id, User.siyavula_account_id == claim)
+            .values(siyavula_account_id=account_id)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    def _create_siyavula_account(self) -> str:
+        url = f"{self.api.base_url}/user"
         payload = {
             "external_user_id": str(self.user.id),
             "password": secrets.token_urlsafe(10),
@@ -105,25 +714,30 @@ class SiyavulaUserAPI:
             "email": self.user.email,
         }
 
-        response = httpx.post(url, headers=headers, json=payload)
-        self.user.siyavula_account_id = response.json()["uuid"]
-        db.session.commit()
+        response = self._request("POST", url, user_auth=False, json=payload)
+        raise_for_unavailable(response, "create user")
+        return response.json()["uuid"]
+
+    def _practice_activity_url(self, section_id: int) -> str:
+        if type(section_id) is not int:
+            raise ValueError("Unexpected section ID")
+
+        return f"{self.api.base_url}/activity/create/practice/{section_id}"
+
+    def _activity_url(self, activity_uuid: str, response_uuid: str, action: str) -> str:
+        if not is_valid_uuid(activity_uuid) or not is_valid_uuid(response_uuid):
+            raise ValueError("Unexpected uuids")
+
+        return f"{self.api.base_url}/activity/{activity_uuid}/response/{response_uuid}/{action}"
 
     def create_practice_activity(self, section_id: int) -> httpx.Response:
         """
         Create a practice activity
-            section_id: The section ID to be practised. Can be retrieved from the ToC endpoint.
+            section_id: The section ID to be practised. Can be retrieved from /siyavula/toc.
         """
         self.get_or_create_user_token()
-
-        if type(section_id) is not int:
-            raise ValueError("Unexpected section ID")
-
-        url = f"https://www.siyavula.com/api/siyavula/v1/activity/create/practice/{section_id}"
-        headers = {"JWT": self.client_token, "Authorization": f"JWT {self.user_token}"}
-
-        response = httpx.get(url, headers=headers)
-        return response
+        url = self._practice_activity_url(section_id)
+        return self._request("GET", url, stream=self.stream)
 
     def practice_submit_answer(
         self, activity_uuid: str, response_uuid: str, form_data: Dict
@@ -134,15 +748,8 @@ class SiyavulaUserAPI:
             response_uuid: The response uuid returned in the create activity response.
         """
         self.get_or_create_user_token()
-
-        if not is_valid_uuid(activity_uuid) or not is_valid_uuid(response_uuid):
-            raise ValueError("Unexpected uuids")
-
-        url = f"https://www.siyavula.com/api/siyavula/v1/activity/{activity_uuid}/response/{response_uuid}/submit-answer"
-        headers = {"JWT": self.client_token, "Authorization": f"JWT {self.user_token}"}
-
-        response = httpx.post(url, headers=headers, data=form_data)
-        return response
+        url = self._activity_url(activity_uuid, response_uuid, "submit-answer")
+        return self._request("POST", url, stream=self.stream, data=form_data)
 
     def practice_next_question(
         self, activity_uuid: str, response_uuid: str
@@ -153,15 +760,8 @@ class SiyavulaUserAPI:
             response_uuid: The response uuid returned in the create activity response.
         """
         self.get_or_create_user_token()
-
-        if not is_valid_uuid(activity_uuid) or not is_valid_uuid(response_uuid):
-            raise ValueError("Unexpected uuids")
-
-        url = f"https://www.siyavula.com/api/siyavula/v1/activity/{activity_uuid}/response/{response_uuid}/next"
-        headers = {"JWT": self.client_token, "Authorization": f"JWT {self.user_token}"}
-
-        response = httpx.get(url, headers=headers)
-        return response
+        url = self._activity_url(activity_uuid, response_uuid, "next")
+        return self._request("GET", url, stream=self.stream)
 
     def practice_retry(self, activity_uuid: str, response_uuid: str) -> httpx.Response:
         """
@@ -170,25 +770,60 @@ class SiyavulaUserAPI:
             response_uuid: The response uuid returned in the create activity response.
         """
         self.get_or_create_user_token()
+        url = self._activity_url(activity_uuid, response_uuid, "retry")
+        return self._request("GET", url, stream=self.stream)
 
-        if not is_valid_uuid(activity_uuid) or not is_valid_uuid(response_uuid):
-            raise ValueError("Unexpected uuids")
-
-        url = f"https://www.siyavula.com/api/siyavula/v1/activity/{activity_uuid}/response/{response_uuid}/retry"
-        headers = {"JWT": self.client_token, "Authorization": f"JWT {self.user_token}"}
 
-        response = httpx.get(url, headers=headers)
-        return response
+def siyavula_curricula(config) -> List[Tuple[str, str]]:
+    """
+    The (region, curriculum) pairs clients may ask for: the configured one, followed by
+    the "REGION:CURRICULUM" entries of SIAVULA_EXTRA_CURRICULA
+    """
+    pairs = [
+        (config["SIAVULA_API_CLIENT_REGION"], config["SIAVULA_API_CLIENT_CURRICULUM"])
+    ]
+    for entry in config["SIAVULA_EXTRA_CURRICULA"].split(","):
+        region, _, curriculum = entry.strip().partition(":")
+        if not (region and curriculum):
+            if entry.strip():
+                raise ValueError(f"Expected REGION:CURRICULUM, got {entry!r}")
+            continue
+        if (region, curriculum) not in pairs:
+            pairs.append((region, curriculum))
+    return pairs
+
+
+def configured_siyavula_api(
+    region: Optional[str] = None, curriculum: Optional[str] = None
+) -> SiyavulaAPI:
+    """
+    The shared Siyavula API client of the current app's settings, for the configured
+    region and curriculum unless others are given. Callers must only pass pairs from
+    siyavula_curricula(), as a client is kept per pair for the life of the process.
+    """
+    config = current_app.config
+    return get_siyavula_api(
+        name=config["SIAVULA_API_CLIENT_NAME"],
+        password=config["SIAVULA_API_CLIENT_PASS"],
+        region=region or config["SIAVULA_API_CLIENT_REGION"],
+        curriculum=curriculum or config["SIAVULA_API_CLIENT_CURRICULUM"],
+        token_ttl=config["SIAVULA_CLIENT_TOKEN_TTL"],
+        refresh_margin=config["SIAVULA_TOKEN_REFRESH_MARGIN"],
+        user_token_cache_size=config["SIAVULA_USER_TOKEN_CACHE_SIZE"],
+        base_url=config["SIAVULA_API_BASE_URL"],
+        timeouts=operation_timeouts(config),
+        retries=config["SIAVULA_RETRIES"],
+        retry_backoff=config["SIAVULA_RETRY_BACKOFF"],
+        breaker=CircuitBreaker(
+            config["SIAVULA_BREAKER_FAILURES"], config["SIAVULA_BREAKER_RESET"]
+        ),
+        account_claim_timeout=config["SIAVULA_ACCOUNT_CLAIM_TIMEOUT"],
+    )
 
 
 def instantiate_siyavula():
     try:
-        g.siavula_api = SiyavulaAPI(
-            name=Config.SIAVULA_API_CLIENT_NAME,
-            password=Config.SIAVULA_API_CLIENT_PASS,
-            region=Config.SIAVULA_API_CLIENT_REGION,
-            curriculum=Config.SIAVULA_API_CLIENT_CURRICULUM,
-        )
-
-    except Exception:
+        g.siavula_api = configured_siyavula_api()
+    except Exception as exc:
         logging.critical("Failed to connect to Siyavula API", exc_info=True)
+        raise SiyavulaUnavailable("Failed to connect to Siyavula API") from exc
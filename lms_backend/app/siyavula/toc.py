@@ -0,0 +1,181 @@
+"""
+Siyavula's table of contents, which lists the section ids practice activities are created
+for. The tree is large and rarely changes, so it is kept in memory and on disk and only
+revalidated with Siyavula, by ETag, once it is older than SIAVULA_TOC_TTL.
+"""
+
+from typing import Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from flask import current_app
+
+from lms_backend.app.cache import SingleFlight, TTLCache
+from lms_backend.app.siyavula.services import (
+    SiyavulaAPI,
+    SiyavulaUnavailable,
+    raise_for_unavailable,
+)
+
+TOC_CACHE_EXTENSION = "siyavula_toc_cache"
+_toc_cache_lock = threading.Lock()
+
+# (region, curriculum, subject, grade)
+TocKey = Tuple[str, str, str, int]
+
+
+class TocEntry:
+    def __init__(
+        self, body: bytes, upstream_etag: Optional[str], fetched_at: float
+    ) -> None:
+        self.body = body
+        # Sent back to Siyavula to revalidate
+        self.upstream_etag = upstream_etag
+        # Wall clock time, so that it stays meaningful on disk
+        self.fetched_at = fetched_at
+        # Served to our clients
+        self.etag = hashlib.sha256(body).hexdigest()
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class TocCache:
+    """
+    Tables of contents by region, curriculum, subject and grade, in memory and, when
+    `directory` is set, on disk so that they survive restarts and are shared by workers
+    """
+
+    def __init__(
+        self, ttl: float = 86400, directory: str = "", maxsize: int = 64
+    ) -> None:
+        """
+        Initialise the cache
+            ttl: seconds a table of contents is served before it is revalidated
+            directory: where tables of contents are stored, "" to only keep them in memory
+            maxsize: tables of contents kept in memory
+        """
+        self.ttl = ttl
+        self.directory = directory
+        # Expired entries are kept, to be revalidated or served when Siyavula fails
+        self._memory = TTLCache(maxsize=maxsize, ttl=float("inf"))
+        self._flights = SingleFlight()
+
+    def path(self, key: TocKey) -> str:
+        return os.path.join(self.directory, "toc-{}-{}-{}-{}".format(*key))
+
+    def load(self, key: TocKey) -> Optional[TocEntry]:
+        if not self.directory:
+            return None
+        path = self.path(key)
+        try:
+            with open(f"{path}.meta.json", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(f"{path}.json", "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return TocEntry(body, meta.get("upstream_etag"), meta["fetched_at"])
+
+    def save(self, key: TocKey, entry: TocEntry):
+        """
+        Keeps the entry in memory and writes it to disk.
+        Files are replaced atomically, body first, so readers never see a partial one.
+        """
+        self._memory.set(key, entry)
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        meta = {"upstream_etag": entry.upstream_etag, "fetched_at": entry.fetched_at}
+        for suffix, data in (
+            (".json", entry.body),
+            (".meta.json", json.dumps(meta).encode("utf-8")),
+        ):
+            tmp = f"{path}{suffix}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, f"{path}{suffix}")
+
+    def get(self, api: SiyavulaAPI, subject: str, grade: int) -> TocEntry:
+        """
+        The table of contents from memory, else from disk, revalidated or fetched from
+        Siyavula when older than the ttl. Concurrent misses for a key share one fetch.
+        A stale copy is served if Siyavula cannot be reached. Raises LookupError if
+        Siyavula has no such table of contents.
+        """
+        key = (api.region, api.curriculum, subject, grade)
+        entry = self._memory.get(key)
+        if entry is not None and entry.age() < self.ttl:
+            return entry
+        return self._flights.do(key, lambda: self._refresh(api, key, entry))
+
+    def _refresh(
+        self, api: SiyavulaAPI, key: TocKey, entry: Optional[TocEntry]
+    ) -> TocEntry:
+        # Another worker may have fetched it, or it was stored before a restart
+        stored = self.load(key)
+        if stored is not None and (
+            entry is None or stored.fetched_at > entry.fetched_at
+        ):
+            entry = stored
+            self._memory.set(key, entry)
+        if entry is not None and entry.age() < self.ttl:
+            return entry
+
+        try:
+            entry = self._fetch(api, key, entry)
+        except SiyavulaUnavailable:
+            if entry is None:
+                raise
+            logging.warning("Serving a stale Siyavula table of contents", exc_info=True)
+            return entry
+        self.save(key, entry)
+        return entry
+
+    def _fetch(
+        self, api: SiyavulaAPI, key: TocKey, cached: Optional[TocEntry]
+    ) -> TocEntry:
+        _, _, subject, grade = key
+        url = f"{api.base_url}/toc/subject/{subject}/grade/{grade}"
+        headers = {}
+        if cached is not None and cached.upstream_etag:
+            headers["If-None-Match"] = cached.upstream_etag
+
+        response = api.send("GET", url, headers={"JWT": api.client_token, **headers})
+        if response.status_code == 401:
+            api.invalidate_client_token()
+            response = api.send(
+                "GET", url, headers={"JWT": api.client_token, **headers}
+            )
+        if response.status_code == 304 and cached is not None:
+            return TocEntry(cached.body, cached.upstream_etag, time.time())
+        if response.status_code == 404:
+            raise LookupError(
+                f"Siyavula has no table of contents for {subject} {grade}"
+            )
+        raise_for_unavailable(response, "toc")
+        return TocEntry(response.content, response.headers.get("ETag"), time.time())
+
+
+def get_toc_cache() -> TocCache:
+    """
+    Returns the current app's table of contents cache, creating it on first use
+    """
+    cache = current_app.extensions.get(TOC_CACHE_EXTENSION)
+    if cache is None:
+        with _toc_cache_lock:
+            cache = current_app.extensions.get(TOC_CACHE_EXTENSION)
+            if cache is None:
+                config = current_app.config
+                cache = TocCache(
+                    ttl=config["SIAVULA_TOC_TTL"],
+                    directory=config["SIAVULA_TOC_CACHE_DIR"],
+                    maxsize=config["SIAVULA_TOC_CACHE_SIZE"],
+                )
+                current_app.extensions[TOC_CACHE_EXTENSION] = cache
+    return cache
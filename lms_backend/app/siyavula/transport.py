@@ -0,0 +1,160 @@
+"""
+Transports for the Siyavula HTTP clients: record real exchanges to a cassette file, or
+replay a cassette, with the original timings, in place of the Siyavula API.
+
+A cassette is a JSON Lines file with one exchange per line. It holds Siyavula's
+responses, including tokens, so treat it like a credential.
+"""
+
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+import base64
+import itertools
+import json
+import threading
+import time
+
+import httpx
+
+from lms_backend.app.metrics import upstream_operation
+
+TRANSPORT_MODES = ("live", "record", "replay")
+# Hop-by-hop and encoding headers describe the original transfer, not the recorded body
+SKIPPED_HEADERS = {
+    "connection",
+    "content-encoding",
+    "content-length",
+    "keep-alive",
+    "set-cookie",
+    "transfer-encoding",
+}
+
+
+def exchange_record(
+    request: httpx.Request, response: httpx.Response, elapsed: float
+) -> Dict:
+    return {
+        "method": request.method,
+        "path": request.url.path,
+        "query": request.url.query.decode("ascii"),
+        "status": response.status_code,
+        "headers": [
+            [name, value]
+            for name, value in response.headers.items()
+            if name.lower() not in SKIPPED_HEADERS
+        ],
+        "body": base64.b64encode(response.content).decode("ascii"),
+        "elapsed": elapsed,
+    }
+
+
+class Cassette:
+    """
+    Recorded exchanges, appended to or read from a JSON Lines file
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._exchanges: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+        self._by_operation: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+        self._cycles: Dict[Tuple[str, str], itertools.cycle] = {}
+
+    def append(self, record: Dict):
+        line = json.dumps(record) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def load(self) -> "Cassette":
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._exchanges[(record["method"], record["path"])].append(record)
+                    operation = upstream_operation(record["path"])
+                    self._by_operation[(record["method"], operation)].append(record)
+        return self
+
+    def match(self, request: httpx.Request) -> Dict:
+        """
+        The next recorded exchange for this method and path. Requests for ids that were
+        not recorded, e.g. other users under load, get one of the same operation.
+        Matching exchanges are served in turn.
+        """
+        key = (request.method, request.url.path)
+        records = self._exchanges.get(key)
+        if not records:
+            key = (request.method, upstream_operation(request.url.path))
+            records = self._by_operation.get(key)
+        if not records:
+            raise httpx.ConnectError(
+                f"No recorded Siyavula exchange for {request.method} {request.url.path}",
+                request=request,
+            )
+        with self._lock:
+            if key not in self._cycles:
+                self._cycles[key] = itertools.cycle(records)
+            return next(self._cycles[key])
+
+
+def replayed_response(record: Dict) -> httpx.Response:
+    return httpx.Response(
+        record["status"],
+        headers=record["headers"],
+        content=base64.b64decode(record["body"]),
+    )
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """
+    Sends requests to Siyavula and appends each exchange to the cassette.
+    Responses are read in full to be recorded, so they are not streamed.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, cassette: Cassette) -> None:
+        self.transport = transport
+        self.cassette = cassette
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        response = self.transport.handle_request(request)
+        response.read()
+        elapsed = time.perf_counter() - started
+        self.cassette.append(exchange_record(request, response, elapsed))
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """
+    Serves recorded exchanges, taking the recorded time divided by `speed`
+    """
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0) -> None:
+        self.cassette = cassette
+        self.speed = speed
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        record = self.cassette.match(request)
+        if self.speed > 0:
+            time.sleep(record["elapsed"] / self.speed)
+        return replayed_response(record)
+
+
+def create_transport(
+    config, live: Callable[[], httpx.BaseTransport]
+) -> httpx.BaseTransport:
+    """
+    The transport for SIAVULA_TRANSPORT_MODE, wrapping or replacing the one made by `live`
+    """
+    mode = config["SIAVULA_TRANSPORT_MODE"]
+    if mode not in TRANSPORT_MODES:
+        raise ValueError(f"Unsupported SIAVULA_TRANSPORT_MODE: {mode}")
+    if mode == "record":
+        return RecordingTransport(live(), Cassette(config["SIAVULA_CASSETTE"]))
+    if mode == "replay":
+        cassette = Cassette(config["SIAVULA_CASSETTE"]).load()
+        return ReplayTransport(cassette, config["SIAVULA_REPLAY_SPEED"])
+    return live()
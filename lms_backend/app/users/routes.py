@@ -1,12 +1,27 @@
-from flask import jsonify
+from typing import List, Optional
+import csv
+import io
+from flask import current_app, jsonify, request, url_for
 from lms_backend.app.models import User
-from lms_backend.app.db import db
-from lms_backend.app.auth import basic_auth
-from pydantic import BaseModel, EmailStr
+from lms_backend.app.db import db, insert_ignoring_conflicts
+from lms_backend.app.auth import (
+    auth,
+    basic_auth,
+    bearer_tokens_enabled,
+    generate_auth_token,
+)
+from pydantic import BaseModel, EmailStr, Field
+from sqlalchemy import select
 from enum import Enum
 from werkzeug.security import generate_password_hash
 from flask_openapi3 import Tag, APIBlueprint
-from lms_backend.app.utils import to_dict
+from lms_backend.app.users.services import BulkUserResult, bulk_create_users
+from lms_backend.app.provisioning.services import (
+    enqueue_provisioning,
+    wake_provisioning,
+)
+from lms_backend.app.utils import json_response, schema_columns
+from lms_backend.app.versioning import conditional
 
 # Set tags for use in OpenAPI Swagger documentation
 auth_tag = Tag(name="auth", description="Authentication")
@@ -15,6 +30,10 @@ auth_tag = Tag(name="auth", description="Authentication")
 auth_bp = APIBlueprint("auth", __name__, url_prefix="/auth")
 
 
+# Page size of GET /auth/users when paging with `after` and no `limit`
+USERS_PAGE_SIZE = 100
+
+
 # Pydantic models for validation
 class RoleEnum(str, Enum):
     learner = "Learner"
@@ -40,6 +59,34 @@ class UserCreateSchema(BaseModel):
     role: RoleEnum
 
 
+class BulkUserResponseSchema(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkUserResult]
+
+
+class UserQuerySchema(BaseModel):
+    after: Optional[int] = Field(
+        None, description="Cursor: return users with an id greater than this"
+    )
+    limit: Optional[int] = Field(
+        None,
+        ge=1,
+        le=1000,
+        description="Page size, 100 when only `after` is given. Without both, all users are returned",
+    )
+    grade: Optional[int] = None
+    role: Optional[RoleEnum] = None
+    curriculum: Optional[CurriculumEnum] = None
+    country: Optional[str] = None
+
+
+class TokenResponseSchema(BaseModel):
+    token: str
+    token_type: str
+    expires_in: int
+
+
 class UserResponseSchema(BaseModel):
     id: int
     email: EmailStr
@@ -53,39 +100,123 @@ class UserResponseSchema(BaseModel):
 
 # Endpoints
 @auth_bp.post("/users", tags=[auth_tag], responses={200: UserResponseSchema, 409: {}})
-@basic_auth.login_required
+@auth.login_required
 def create_user(body: UserCreateSchema) -> UserResponseSchema:
     """
     Create a new user
     """
-    # Check if user already exists
-    if User.query.filter_by(email=body.email).first():
+    # Create new user, unless the email is taken
+    values = {
+        **body.model_dump(mode="json", exclude={"password"}),
+        "password_hash": generate_password_hash(body.password),
+    }
+    statement = insert_ignoring_conflicts(User, ["email"]).values(**values)
+    user_id = db.session.execute(statement.returning(User.id)).scalar()
+    if user_id is None:
+        db.session.rollback()
         return jsonify({"message": "User with this email already exists"}), 409
+    enqueue_provisioning([user_id])
+    db.session.commit()
+    wake_provisioning()
+
+    return json_response(UserResponseSchema, {"id": user_id, **values}, status=201)
+
 
-    # Create new user
-    user = User(
-        email=body.email,
-        name=body.name,
-        surname=body.surname,
-        password_hash=generate_password_hash(body.password),
-        grade=body.grade,
-        country=body.country,
-        curriculum=body.curriculum,
-        role=body.role,
+@auth_bp.post(
+    "/users/bulk",
+    tags=[auth_tag],
+    responses={200: BulkUserResponseSchema, 400: {}, 413: {}},
+)
+@auth.login_required
+def create_users_bulk():
+    """
+    Create many users at once, from a JSON list of users or a CSV file (text/csv)
+    with a header row of the same fields.
+    Returns a result per row: created, invalid or conflict.
+    """
+    if request.mimetype == "text/csv":
+        rows = list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    else:
+        rows = request.get_json(silent=True)
+        if isinstance(rows, dict):
+            rows = rows.get("users")
+    if not isinstance(rows, list):
+        return jsonify({"message": "Expected a list of users"}), 400
+
+    max_rows = current_app.config["BULK_IMPORT_MAX_ROWS"]
+    if len(rows) > max_rows:
+        return jsonify({"message": f"At most {max_rows} users per import"}), 413
+
+    results = bulk_create_users(
+        rows,
+        schema=UserCreateSchema,
+        hash_workers=current_app.config["BULK_IMPORT_HASH_WORKERS"],
+        batch_size=current_app.config["BULK_IMPORT_BATCH_SIZE"],
     )
-    db.session.add(user)
-    db.session.commit()
-    response_instance = UserResponseSchema(**to_dict(user, User))
-    return jsonify(response_instance.model_dump()), 201
+    wake_provisioning()
+    created = sum(result.status == "created" for result in results)
+    response_instance = BulkUserResponseSchema(
+        created=created, failed=len(results) - created, results=results
+    )
+    return jsonify(response_instance.model_dump()), 200
 
 
-@auth_bp.get("/users", tags=[auth_tag])
+@auth_bp.get("/users", tags=[auth_tag], responses={304: {}})
+@auth.login_required
+@conditional("user")
+def get_users(query: UserQuerySchema):
+    """
+    Get a page of users, ordered by id, or all users when neither `limit` nor `after`
+    is given. When more users match, the `Link` header points to the next page.
+    Supports If-None-Match and If-Modified-Since, answered with a 304 while no user changed.
+    """
+    users_query = select(*schema_columns(UserResponseSchema, User))
+    if query.grade is not None:
+        users_query = users_query.where(User.grade == query.grade)
+    if query.role:
+        users_query = users_query.where(User.role == query.role.value)
+    if query.curriculum:
+        users_query = users_query.where(User.curriculum == query.curriculum.value)
+    if query.country:
+        users_query = users_query.where(User.country == query.country)
+    if query.after is not None:
+        users_query = users_query.where(User.id > query.after)
+
+    users_query = users_query.order_by(User.id)
+    if query.limit is None and query.after is None:
+        # Unpaginated, as before cursors were added
+        users = db.session.execute(users_query).all()
+        return json_response(UserResponseSchema, users, many=True), 200
+
+    limit = query.limit or USERS_PAGE_SIZE
+    # Fetch one extra row to learn whether there is a next page
+    users = db.session.execute(users_query.limit(limit + 1)).all()
+    has_next = len(users) > limit
+    users = users[:limit]
+
+    response = json_response(UserResponseSchema, users, many=True)
+    if has_next:
+        next_args = {**request.args.to_dict(), "after": users[-1].id, "limit": limit}
+        next_url = url_for("auth.get_users", **next_args)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+        response.headers["X-Next-Cursor"] = str(users[-1].id)
+    return response, 200
+
+
+@auth_bp.post("/token", tags=[auth_tag], responses={200: TokenResponseSchema, 503: {}})
 @basic_auth.login_required
-def get_users():
+def create_token():
     """
-    Get all users
+    Exchange Basic credentials for a short-lived bearer token.
+    Answers 503 while SECRET_KEY is unset or the default.
     """
-    users = User.query.all()
-
-    response_instances = [UserResponseSchema(**to_dict(user, User)) for user in users]
-    return jsonify([instance.model_dump() for instance in response_instances]), 200
+    if not bearer_tokens_enabled(current_app.config):
+        return jsonify(
+            {"message": "Bearer tokens are disabled until SECRET_KEY is set"}
+        ), 503
+    response_instance = TokenResponseSchema(
+        token=generate_auth_token(basic_auth.current_user()),
+        token_type="Bearer",
+        expires_in=current_app.config["AUTH_TOKEN_EXPIRATION"],
+    )
+    return jsonify(response_instance.model_dump()), 200
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+from werkzeug.security import generate_password_hash
+
+from lms_backend.app.db import db, insert_ignoring_conflicts
+from lms_backend.app.models import User
+from lms_backend.app.provisioning.services import enqueue_provisioning
+from lms_backend.app.utils import chunked
+
+
+class BulkUserResult(BaseModel):
+    row: int
+    email: Optional[str] = None
+    status: str
+    id: Optional[int] = None
+    message: Optional[str] = None
+
+
+def hash_passwords(passwords: List[str], workers: int) -> List[str]:
+    """
+    Hash passwords, spread over a few threads when there are enough of them.
+    The hash runs in hashlib, which releases the GIL, so threads hash in parallel
+    without the cost of starting processes on every request.
+    """
+    if workers <= 1 or len(passwords) < workers * 2:
+        return [generate_password_hash(password) for password in passwords]
+
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="hash-passwords"
+    ) as executor:
+        return list(executor.map(generate_password_hash, passwords))
+
+
+def existing_emails(emails: Iterable[str]) -> set:
+    """
+    The given emails that already belong to a user, found with set-based queries
+    """
+    found = set()
+    for chunk in chunked(list(emails)):
+        found.update(
+            db.session.scalars(select(User.email).where(User.email.in_(chunk)))
+        )
+    return found
+
+
+def bulk_create_users(
+    rows: List[Dict], schema: type, hash_workers: int, batch_size: int
+) -> List[BulkUserResult]:
+    """
+    Validate and create many users in a single transaction.
+    Returns a result per input row, in input order.
+        rows: raw user dicts, as parsed from JSON or CSV
+        schema: pydantic model each row is validated against
+        hash_workers: threads used to hash passwords
+        batch_size: users inserted per INSERT statement
+    """
+    results: List[BulkUserResult] = []
+    valid = []
+    for index, row in enumerate(rows, start=1):
+        try:
+            user = schema.model_validate(row)
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = ".".join(str(part) for part in error["loc"])
+            results.append(
+                BulkUserResult(
+                    row=index,
+                    email=row.get("email") if isinstance(row, dict) else None,
+                    status="invalid",
+                    message=f"{field}: {error['msg']}" if field else error["msg"],
+                )
+            )
+            continue
+        result = BulkUserResult(row=index, email=user.email, status="created")
+        results.append(result)
+        valid.append((result, user))
+
+    # Drop emails that already exist, or repeat within this import
+    taken = existing_emails(user.email for _, user in valid)
+    new = []
+    for result, user in valid:
+        if user.email in taken:
+            result.status = "conflict"
+            result.message = "User with this email already exists"
+            continue
+        taken.add(user.email)
+        new.append((result, user))
+
+    password_hashes = hash_passwords([user.password for _, user in new], hash_workers)
+    values = [
+        {
+            **user.model_dump(mode="json", exclude={"password"}),
+            "password_hash": password_hash,
+        }
+        for (_, user), password_hash in zip(new, password_hashes)
+    ]
+    # Emails taken concurrently since the check above are skipped by the database
+    statement = insert_ignoring_conflicts(User, ["email"]).returning(
+        User.email, User.id
+    )
+    ids = {}
+    for batch in chunked(values, batch_size):
+        ids.update(db.session.execute(statement, batch).all())
+    # Siyavula accounts of the new users are created in the background, if enabled
+    enqueue_provisioning(ids.values())
+    db.session.commit()
+
+    for result, user in new:
+        result.id = ids.get(user.email)
+        if result.id is None:
+            result.status = "conflict"
+            result.message = "User with this email already exists"
+    return results
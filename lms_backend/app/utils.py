@@ -1,3 +1,9 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Iterator, List, Sequence, Type
+from flask import Response
+from pydantic import BaseModel, EmailStr, TypeAdapter, create_model
+from sqlalchemy import select
 from lms_backend.app.config import Config
 from lms_backend.app.db import db
 from lms_backend.app.models import Course, User
@@ -6,13 +12,22 @@ import uuid
 from werkzeug.security import generate_password_hash
 
 
+# Courses every installation starts with
+STANDARD_COURSES = ["maths", "science", "physics", "chemistry"]
+
+
+def utcnow() -> datetime:
+    # Naive UTC, like the database's CURRENT_TIMESTAMP defaults
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 def create_demo_user(config: Config):
     """
-    Creates a user in the database
+    Adds the demo user to the session, unless it exists. The caller commits
     """
     # Check if user already exists
     email = config.DEMO_USER_NAME
-    existing_user = User.query.filter_by(email=email).first()
+    existing_user = db.session.scalar(select(User.id).where(User.email == email))
 
     if existing_user:
         return
@@ -29,26 +44,22 @@ def create_demo_user(config: Config):
         role="Teacher",
     )
     db.session.add(user)
-    db.session.commit()
 
 
 def create_standard_courses():
     """
-    Creates default courses in the database
+    Adds the default courses that do not exist yet to the session. The caller commits
     """
-    standard_courses = ["maths", "science", "physics", "chemistry"]
-
-    # Check if course already exists
-    for course_name in standard_courses:
-        existing_course = Course.query.filter_by(name=course_name).first()
-
-        if existing_course:
-            return
-
-        # Create new course
-        course = Course(name=course_name)
-        db.session.add(course)
-        db.session.commit()
+    existing_courses = set(
+        db.session.scalars(
+            select(Course.name).where(Course.name.in_(STANDARD_COURSES))
+        ).all()
+    )
+    db.session.add_all(
+        Course(name=course_name)
+        for course_name in STANDARD_COURSES
+        if course_name not in existing_courses
+    )
 
 
 def to_dict(object, model):
@@ -60,6 +71,55 @@ def to_dict(object, model):
     }
 
 
+# Keeps IN (...) lists below SQLite's bound parameter limit
+IN_CLAUSE_CHUNK_SIZE = 500
+
+
+def chunked(items: Sequence, size: int = IN_CLAUSE_CHUNK_SIZE) -> Iterator[Sequence]:
+    """
+    Split a sequence into consecutive slices of at most `size` items
+    """
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def schema_columns(schema: Type[BaseModel], model) -> List:
+    """
+    The model's columns needed to build `schema`, to select only those
+    """
+    return [model.__table__.columns[name] for name in schema.model_fields]
+
+
+@lru_cache(maxsize=None)
+def type_adapter(schema: Type[BaseModel], many: bool = False) -> TypeAdapter:
+    """
+    Cached validator/serialiser for a response schema, or for a list of it.
+    Emails read back from our database were validated on the way in, so EmailStr fields
+    are treated as plain strings here; that check dominates the cost of a large list.
+    """
+    fields = {
+        name: (
+            str if field.annotation is EmailStr else field.annotation,
+            ... if field.is_required() else field.default,
+        )
+        for name, field in schema.model_fields.items()
+    }
+    response_schema = create_model(schema.__name__, **fields)
+    return TypeAdapter(List[response_schema] if many else response_schema)
+
+
+def json_response(
+    schema: Type[BaseModel], data: Any, many: bool = False, status: int = 200
+) -> Response:
+    """
+    Validate SQLAlchemy objects or rows against a schema in one pass and encode them
+    straight to JSON with pydantic-core, without intermediate dicts or models
+    """
+    adapter = type_adapter(schema, many)
+    body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+    return Response(body, status=status, mimetype="application/json")
+
+
 def is_valid_uuid(val):
     try:
         uuid.UUID(str(val))
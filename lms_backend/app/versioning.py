@@ -0,0 +1,154 @@
+"""
+Conditional GET for the read endpoints. Each versioned table has a change counter that
+is bumped in the transaction of every write to it; together with the table's max(id) it
+makes an ETag that is checked with one small query, before any row is loaded.
+"""
+
+from datetime import datetime
+from functools import wraps
+from itertools import chain
+from typing import Iterable, Optional, Tuple
+
+from flask import make_response, request
+from sqlalchemy import event, func, select, update
+
+from lms_backend.app.db import db, insert_ignoring_conflicts
+from lms_backend.app.models import Course, TableVersion, User, UserCourse
+from lms_backend.app.utils import utcnow
+
+# Tables served by conditional endpoints, by name
+VERSIONED_TABLES = {model.__tablename__: model for model in (User, Course, UserCourse)}
+# Session.info key of the versioned tables written in the current transaction
+CHANGED_TABLES = "changed_tables"
+
+
+def changed_tables(session) -> set:
+    return session.info.setdefault(CHANGED_TABLES, set())
+
+
+@event.listens_for(db.session, "after_flush")
+def track_flushed_changes(session, flush_context):
+    """
+    Notes the versioned tables of the objects added, changed or deleted by a flush
+    """
+    for instance in chain(session.new, session.dirty, session.deleted):
+        table = getattr(instance, "__tablename__", None)
+        if table in VERSIONED_TABLES:
+            changed_tables(session).add(table)
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def track_executed_changes(orm_execute_state):
+    """
+    Notes the versioned table of an INSERT, UPDATE or DELETE statement, which bypasses
+    the flush
+    """
+    state = orm_execute_state
+    if state.is_insert or state.is_update or state.is_delete:
+        table = state.statement.table.name
+        if table in VERSIONED_TABLES:
+            changed_tables(state.session).add(table)
+
+
+@event.listens_for(db.session, "before_commit")
+def bump_table_versions(session):
+    """
+    Bumps the version of every versioned table written by this transaction, as part of it
+    """
+    # Pending objects are flushed now, so that their tables are noted
+    session.flush()
+    tables = sorted(session.info.pop(CHANGED_TABLES, ()))
+    if not tables:
+        return
+    now = utcnow()
+    result = session.execute(
+        update(TableVersion)
+        .where(TableVersion.table_name.in_(tables))
+        .values(version=TableVersion.version + 1, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount < len(tables):
+        session.execute(
+            insert_ignoring_conflicts(TableVersion, ["table_name"]),
+            [
+                {"table_name": table, "version": 1, "updated_at": now}
+                for table in tables
+            ],
+        )
+
+
+@event.listens_for(db.session, "after_rollback")
+def forget_changes(session):
+    session.info.pop(CHANGED_TABLES, None)
+
+
+def table_versions(tables: Iterable[str]) -> Tuple[str, Optional[datetime]]:
+    """
+    The ETag of the tables' current state and the time they last changed, in one query
+    """
+    columns = []
+    for table in tables:
+        model = VERSIONED_TABLES[table]
+        version = select(TableVersion).where(TableVersion.table_name == table)
+        columns += [
+            select(func.max(model.id)).scalar_subquery(),
+            version.with_only_columns(TableVersion.version).scalar_subquery(),
+            version.with_only_columns(TableVersion.updated_at).scalar_subquery(),
+        ]
+    row = db.session.execute(select(*columns)).one()
+
+    etag = ".".join(
+        f"{table}-{row[i * 3] or 0}-{row[i * 3 + 1] or 0}"
+        for i, table in enumerate(tables)
+    )
+    modified = [updated_at for updated_at in row[2::3] if updated_at is not None]
+    return etag, max(modified, default=None)
+
+
+def conditional(*tables: str):
+    """
+    Decorator for read endpoints whose response only depends on `tables` and the request.
+    Adds an ETag and Last-Modified, and answers a matching If-None-Match or
+    If-Modified-Since with a 304 without running the view.
+    The version is read before the view, so a concurrent write can only make the ETag
+    older than the body, which costs the next request a 200.
+    Last-Modified has a resolution of one second, so it is left out while the tables
+    changed in the current second: another write in that second would not be seen.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            etag, last_modified = table_versions(tables)
+            if last_modified and last_modified.replace(
+                microsecond=0
+            ) >= utcnow().replace(microsecond=0):
+                last_modified = None
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = bool(
+                    since
+                    and last_modified
+                    and last_modified.replace(microsecond=0)
+                    <= since.replace(tzinfo=None)
+                )
+
+            if not_modified:
+                response = make_response("", 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            # Cached by the browser only, and revalidated on every use
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
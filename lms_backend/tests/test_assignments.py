@@ -1,4 +1,6 @@
 import unittest
+from unittest import mock
+from sqlalchemy.exc import IntegrityError
 from base64 import b64encode
 from lms_backend.app.config import TestingConfig
 from lms_backend.app.models import User, Course, UserCourse
@@ -99,6 +101,43 @@ class TestAssignmentsBlueprint(unittest.TestCase):
             response.get_json(), {"message": "User-Course Assignment already exists"}
         )
 
+    def test_assign_course_twice(self):
+        """
+        Test assigning the same course twice creates a single assignment
+        """
+        assignment_data = {
+            "user_id": 1,
+            "course_id": 1,
+        }
+
+        responses = [
+            self.client.post(
+                "/assignments",
+                json=assignment_data,
+                headers={"Authorization": self.basic_auth_header},
+            )
+            for _ in range(2)
+        ]
+
+        # Assertions
+        self.assertEqual([r.status_code for r in responses], [201, 409])
+        self.assertEqual(UserCourse.query.filter_by(user_id=1, course_id=1).count(), 1)
+
+    def test_assign_course_unique_index(self):
+        """
+        Test the database rejects a duplicate assignment that skipped the API, as
+        concurrent requests would
+        """
+        db.session.add(UserCourse(user_id=1, course_id=1))
+        db.session.commit()
+        db.session.add(UserCourse(user_id=1, course_id=1))
+
+        # Assertions
+        with self.assertRaises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+        self.assertEqual(UserCourse.query.count(), 1)
+
     def test_assign_course_user_not_found(self):
         """
         Test assigning a course to a non-existent user
@@ -141,6 +180,121 @@ class TestAssignmentsBlueprint(unittest.TestCase):
             response.get_json(), {"message": "Course with this id does not exist"}
         )
 
+    def test_assign_courses_bulk(self):
+        """
+        Test assigning many courses at once, with a result per pair
+        """
+        # Add an existing assignment
+        user_course = UserCourse(user_id=1, course_id=1)
+        db.session.add(user_course)
+        test_course = Course(name="Second Test Course")
+        db.session.add(test_course)
+        db.session.commit()
+
+        assignment_data = {
+            "assignments": [{"user_id": 999, "course_id": 1}],
+            "user_ids": [1],
+            "course_ids": [1, test_course.id, 999],
+        }
+
+        response = self.client.post(
+            "/assignments/bulk",
+            json=assignment_data,
+            headers={"Authorization": self.basic_auth_header},
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(
+            [result["status"] for result in report["results"]],
+            ["invalid", "duplicate", "created", "invalid"],
+        )
+        user_course = UserCourse.query.filter_by(
+            user_id=1, course_id=test_course.id
+        ).first()
+        self.assertEqual(report["results"][2]["id"], user_course.id)
+
+    def test_assign_courses_bulk_chunked(self):
+        """
+        Test a bulk assignment larger than the IN clause and INSERT batch sizes
+        """
+        db.session.add(UserCourse(user_id=1, course_id=1))
+        courses = [Course(name=f"Chunked Course {i}") for i in range(3)]
+        db.session.add_all(courses)
+        db.session.commit()
+        self.app.config["BULK_ASSIGN_BATCH_SIZE"] = 1
+
+        with mock.patch("lms_backend.app.courses.services.IN_CLAUSE_CHUNK_SIZE", 2):
+            response = self.client.post(
+                "/assignments/bulk",
+                json={
+                    "user_ids": [1],
+                    "course_ids": [1] + [course.id for course in courses],
+                },
+                headers={"Authorization": self.basic_auth_header},
+            )
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual(
+            [result["status"] for result in report["results"]],
+            ["duplicate", "created", "created", "created"],
+        )
+        self.assertEqual(UserCourse.query.filter_by(user_id=1).count(), 4)
+
+    def test_get_courses(self):
+        """
+        Test listing courses, with a 304 until a course is added
+        """
+        headers = {"Authorization": self.basic_auth_header}
+        response = self.client.get("/courses", headers=headers)
+        etag = response.headers["ETag"]
+        not_modified = self.client.get(
+            "/courses", headers={**headers, "If-None-Match": etag}
+        )
+
+        db.session.add(Course(name="New Course"))
+        db.session.commit()
+        modified = self.client.get(
+            "/courses", headers={**headers, "If-None-Match": etag}
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Test Course", [course["name"] for course in response.get_json()])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(modified.status_code, 200)
+        self.assertEqual(len(modified.get_json()), len(response.get_json()) + 1)
+
+    def test_get_courses_documented_as_list(self):
+        """
+        Test the OpenAPI document describes GET /courses as a list of courses
+        """
+        responses = self.app.api_doc["paths"]["/courses"]["get"]["responses"]
+        schema = responses["200"]["content"]["application/json"]["schema"]
+        name = schema["$ref"].rsplit("/", 1)[-1]
+
+        # Assertions
+        self.assertEqual(
+            self.app.api_doc["components"]["schemas"][name]["type"], "array"
+        )
+
+    def test_assign_courses_bulk_empty(self):
+        """
+        Test a bulk assignment without any pairs is rejected
+        """
+        response = self.client.post(
+            "/assignments/bulk",
+            json={"user_ids": [1]},
+            headers={"Authorization": self.basic_auth_header},
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 422)
+
 
 def convert_to_basic_auth(username, password):
     token = b64encode(f"{username}:{password}".encode("utf-8")).decode("ascii")
@@ -0,0 +1,169 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from sqlalchemy import text
+from lms_backend.app.bootstrap import bootstrap
+from lms_backend.app.config import TestingConfig
+from lms_backend.app.db import create_indexes, engine_options, sqlite_pragmas
+from lms_backend.app.models import Course, User, UserCourse
+from lms_backend.app.utils import STANDARD_COURSES
+from lms_backend.app import create_app, db
+
+
+class TestDatabaseEngine(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up an app with a file-backed SQLite database, as WAL needs a file
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmpdir.name, "lms.db")
+
+        class FileConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+            DB_SQLITE_BUSY_TIMEOUT = 1234
+
+        self.config = FileConfig
+        self.app = create_app(FileConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        """
+        Clean up the database
+        """
+        db.session.remove()
+        db.engine.dispose()
+        self.app_context.pop()
+        self.tmpdir.cleanup()
+
+    def pragma(self, name):
+        return db.session.execute(text(f"PRAGMA {name}")).scalar()
+
+    def test_sqlite_pragmas_applied(self):
+        """
+        Test that new SQLite connections use the configured pragmas
+        """
+        # Assertions
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+        self.assertEqual(self.pragma("synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma("busy_timeout"), 1234)
+        self.assertEqual(self.pragma("foreign_keys"), 1)
+
+    def test_invalid_pragma_value(self):
+        """
+        Test that a journal mode outside the SQLite keywords is rejected
+        """
+        config = {**self.app.config, "DB_SQLITE_JOURNAL_MODE": "WAL; DROP TABLE user"}
+
+        # Assertions
+        with self.assertRaises(ValueError):
+            sqlite_pragmas(config)
+
+    def test_pool_options_for_server_databases(self):
+        """
+        Test that pool options are only used for non-SQLite databases
+        """
+        config = {
+            **self.app.config,
+            "SQLALCHEMY_DATABASE_URI": "postgresql+psycopg://lms@localhost/lms",
+        }
+
+        # Assertions
+        self.assertEqual(engine_options(self.app.config), {})
+        self.assertEqual(
+            engine_options(config),
+            {
+                "pool_size": 10,
+                "max_overflow": 20,
+                "pool_timeout": 30,
+                "pool_recycle": 1800,
+                "pool_pre_ping": True,
+            },
+        )
+
+    def test_bootstrap_fast_path(self):
+        """
+        Test that an already bootstrapped database is not bootstrapped again
+        """
+        # Assertions
+        self.assertEqual(bootstrap(self.app, self.config), "up to date")
+        self.app.config["BOOTSTRAP_MODE"] = "full"
+        self.assertEqual(bootstrap(self.app, self.config), "full")
+        self.app.config["BOOTSTRAP_MODE"] = "skip"
+        self.assertEqual(bootstrap(self.app, self.config), "skipped")
+
+    def test_startup_times_are_logged(self):
+        """
+        Test that the app creation and bootstrap times are written at the INFO level
+        """
+
+        class InfoConfig(self.config):
+            LOG_LEVEL = "INFO"
+
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            create_app(InfoConfig)
+
+        # Assertions
+        self.assertIn("Database bootstrap (up to date) took", stderr.getvalue())
+        self.assertIn("App created in", stderr.getvalue())
+
+    def test_bootstrap_seeds_missing_courses(self):
+        """
+        Test that a full bootstrap adds every missing standard course
+        """
+        Course.query.filter(Course.name != STANDARD_COURSES[0]).delete()
+        db.session.commit()
+        self.app.config["BOOTSTRAP_MODE"] = "full"
+        bootstrap(self.app, self.config)
+
+        # Assertions
+        self.assertCountEqual(
+            [course.name for course in Course.query.all()], STANDARD_COURSES
+        )
+
+    def test_create_indexes_removes_duplicate_assignments(self):
+        """
+        Test that upgrading a database with duplicate assignments keeps the oldest of
+        each and adds the unique index
+        """
+        db.session.execute(text("DROP INDEX uq_user_course_user_id_course_id"))
+        user = User(
+            email="learner@example.com",
+            name="Existing",
+            surname="User",
+            password_hash="wololo",
+            grade="10",
+            country="ZA",
+            curriculum="CAPS",
+            role="Learner",
+        )
+        db.session.add(user)
+        db.session.flush()
+        courses = [course.id for course in Course.query.order_by(Course.id).limit(2)]
+        for course_id in [courses[0], courses[1], courses[0], courses[0]]:
+            db.session.add(UserCourse(user_id=user.id, course_id=course_id))
+            db.session.flush()
+        db.session.commit()
+        db.session.close()
+        with self.assertLogs("lms_backend.app.db", level="WARNING") as logs:
+            create_indexes()
+
+        # Assertions
+        assignments = db.session.execute(
+            text("SELECT id, course_id FROM user_course ORDER BY id")
+        ).all()
+        self.assertEqual([course_id for _, course_id in assignments], courses)
+        self.assertEqual(assignments[0].id, 1)
+        self.assertIn("Deleted 2 duplicate rows from user_course", logs.output[0])
+        indexes = db.session.execute(text("PRAGMA index_list(user_course)")).all()
+        self.assertIn(
+            ("uq_user_course_user_id_course_id", 1),
+            [(index.name, index.unique) for index in indexes],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+from base64 import b64encode
+
+import httpx
+
+from lms_backend.app import create_app, db
+from lms_backend.app.config import TestingConfig
+from lms_backend.app.metrics import upstream_operation
+from lms_backend.app.siyavula.services import MetricsTransport
+
+SIYAVULA_API = "https://www.siyavula.com/api/siyavula/v1"
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a test client and in-memory database
+        """
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        self.app.app_context().push()
+
+        self.basic_auth_header = convert_to_basic_auth(
+            TestingConfig.DEMO_USER_NAME, TestingConfig.DEMO_USER_PASS
+        )
+
+    def tearDown(self):
+        """
+        Clean up the database
+        """
+        db.session.remove()
+        db.drop_all()
+
+    def test_request_metrics(self):
+        """
+        Test that request latency, database use and password checks are exposed
+        """
+        self.client.get(
+            "/auth/users", headers={"Authorization": self.basic_auth_header}
+        )
+
+        response = self.client.get(
+            "/metrics", headers={"Authorization": self.basic_auth_header}
+        )
+        body = response.get_data(as_text=True)
+        labels = 'blueprint="auth",endpoint="/auth/users"'
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            f'lms_http_request_duration_seconds_count{{{labels},method="GET",status="200"}}',
+            body,
+        )
+        self.assertIn(f"lms_db_queries_per_request_count{{{labels}}}", body)
+        self.assertIn(f"lms_db_time_per_request_seconds_sum{{{labels}}}", body)
+        self.assertIn('lms_auth_password_check_seconds_count{result="valid"}', body)
+
+    def test_upstream_metrics(self):
+        """
+        Test that Siyavula calls are recorded by operation, without ids in the labels
+        """
+        transport = MetricsTransport(
+            httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+        )
+        with httpx.Client(transport=transport) as client:
+            client.post(
+                f"{SIYAVULA_API}/activity/8f7c/response/1d2e/submit-answer", data={}
+            )
+
+        body = self.client.get(
+            "/metrics", headers={"Authorization": self.basic_auth_header}
+        ).get_data(as_text=True)
+
+        # Assertions
+        self.assertIn(
+            'lms_siyavula_request_duration_seconds_count{operation="submit-answer",status="200"}',
+            body,
+        )
+        self.assertEqual(upstream_operation(f"{SIYAVULA_API}/get-token"), "get-token")
+        self.assertEqual(
+            upstream_operation(f"{SIYAVULA_API}/user/42/token"), "user token"
+        )
+        self.assertEqual(
+            upstream_operation(f"{SIYAVULA_API}/activity/create/practice/7"),
+            "create practice activity",
+        )
+
+    def test_metrics_need_credentials(self):
+        """
+        Test that /metrics is only served to a user or to a scraper with METRICS_TOKEN
+        """
+        self.app.config["METRICS_TOKEN"] = "scrape-secret"
+        statuses = [
+            self.client.get("/metrics", headers=headers).status_code
+            for headers in (
+                {},
+                {"Authorization": "Bearer wrong"},
+                {"Authorization": "Bearer scrape-secret"},
+            )
+        ]
+
+        # Assertions
+        self.assertEqual(statuses, [401, 401, 200])
+
+    def test_metrics_disabled(self):
+        """
+        Test that /metrics is not served when metrics are disabled
+        """
+
+        class NoMetricsConfig(TestingConfig):
+            METRICS_ENABLED = False
+
+        app = create_app(NoMetricsConfig)
+
+        # Assertions
+        self.assertEqual(app.test_client().get("/metrics").status_code, 404)
+
+
+def convert_to_basic_auth(username, password):
+    token = b64encode(f"{username}:{password}".encode("utf-8")).decode("ascii")
+    return f"Basic {token}"
+
+
+if __name__ == "__main__":
+    unittest.main()
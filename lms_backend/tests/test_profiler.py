@@ -0,0 +1,108 @@
+import contextlib
+import io
+import json
+import unittest
+from base64 import b64encode
+
+from lms_backend.app import create_app, db
+from lms_backend.app.config import TestingConfig
+from lms_backend.app.db import QUERY_OBSERVERS_EXTENSION
+from lms_backend.app.metrics import count_query
+from lms_backend.app.profiler import QueryProfile, record_statement
+
+
+class ProfilerTestingConfig(TestingConfig):
+    SQL_PROFILER_ENABLED = True
+
+
+class TestSQLProfiler(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a test client and in-memory database with the SQL profiler enabled
+        """
+        self.app = create_app(ProfilerTestingConfig)
+        self.client = self.app.test_client()
+        self.app.app_context().push()
+
+        self.basic_auth_header = convert_to_basic_auth(
+            TestingConfig.DEMO_USER_NAME, TestingConfig.DEMO_USER_PASS
+        )
+
+    def tearDown(self):
+        """
+        Clean up the database
+        """
+        db.session.remove()
+        db.drop_all()
+
+    def test_request_is_profiled(self):
+        """
+        Test that a request gets a Server-Timing header and a JSON log line
+        """
+        with self.assertLogs("lms_backend.app.profiler", level="INFO") as logs:
+            response = self.client.get(
+                "/auth/users", headers={"Authorization": self.basic_auth_header}
+            )
+        profile = json.loads(logs.records[-1].getMessage())
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response.headers["Server-Timing"],
+            r'^db;dur=[\d.]+;desc="3 queries", app;dur=[\d.]+$',
+        )
+        self.assertEqual(profile["endpoint"], "auth.get_users")
+        # The user's credentials, the users table version and the page of users
+        self.assertEqual(profile["queries"], 3)
+        self.assertEqual(profile["repeated"], [])
+
+    def test_profile_is_logged_without_logging_config(self):
+        """
+        Test that the per-request line reaches stderr when nothing configured logging
+        """
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.client.get(
+                "/auth/users", headers={"Authorization": self.basic_auth_header}
+            )
+
+        # Assertions
+        self.assertIn('"event": "sql_profile"', stderr.getvalue())
+
+    def test_repeated_statements_are_flagged(self):
+        """
+        Test that a statement run more than once in a request is reported
+        """
+        profile = QueryProfile()
+        for _ in range(3):
+            profile.record("SELECT * FROM user\n WHERE id = ?", 0.001)
+        profile.record("SELECT * FROM course", 0.001)
+
+        # Assertions
+        self.assertEqual(profile.queries, 4)
+        self.assertEqual(
+            profile.repeated(threshold=2),
+            [{"statement": "SELECT * FROM user WHERE id = ?", "count": 3, "ms": 3.0}],
+        )
+
+    def test_profiler_shares_query_timing(self):
+        """
+        Test that the profiler and the metrics share one set of timing listeners
+        """
+        listeners = db.engine.dispatch.before_cursor_execute
+
+        # Assertions
+        self.assertEqual(len(listeners), 1)
+        self.assertEqual(
+            self.app.extensions[QUERY_OBSERVERS_EXTENSION],
+            [count_query, record_statement],
+        )
+
+
+def convert_to_basic_auth(username, password):
+    token = b64encode(f"{username}:{password}".encode("utf-8")).decode("ascii")
+    return f"Basic {token}"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+import gzip
+import json
+import tempfile
+import unittest
+import uuid
+from base64 import b64encode
+
+import httpx
+
+from lms_backend.app import create_app, db
+from lms_backend.app.config import TestingConfig
+from lms_backend.app.db import dispose_engines
+from lms_backend.app.models import Course, PracticeEvent, User, UserCourse
+from lms_backend.app.progress.services import flush_progress
+from lms_backend.app.siyavula import services
+
+
+class TestProgress(unittest.TestCase):
+    stream = False
+
+    def setUp(self):
+        """
+        Set up a test client, a file database shared with the recorder thread and a
+        stubbed Siyavula API serving one practice activity
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+        class ProgressTestingConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{self.tmpdir.name}/lms.db"
+            PRACTICE_PROGRESS_ENABLED = True
+            PRACTICE_PROGRESS_FLUSH_INTERVAL = 0.01
+            SIAVULA_STREAM_RESPONSES = self.stream
+
+        self.app = create_app(ProgressTestingConfig)
+        self.client = self.app.test_client()
+        self.app.app_context().push()
+
+        self.activity_id = str(uuid.uuid4())
+        self.response_ids = []
+        self.app.extensions[services.HTTP_CLIENT_EXTENSION] = httpx.Client(
+            transport=httpx.MockTransport(self.handler)
+        )
+        services._siyavula_apis.clear()
+
+        self.user_ids = []
+        for i in range(2):
+            user = User(
+                email=f"learner{i}@example.com",
+                name="Learner",
+                surname=str(i),
+                password_hash="wololo",
+                grade="10",
+                country="ZA",
+                curriculum="CAPS",
+                role="Learner",
+                siyavula_account_id=f"account-{i}",
+            )
+            db.session.add(user)
+            db.session.flush()
+            self.user_ids.append(user.id)
+        self.course_id = Course.query.first().id
+        db.session.add_all(
+            UserCourse(user_id=user_id, course_id=self.course_id)
+            for user_id in self.user_ids
+        )
+        db.session.commit()
+
+        self.basic_auth_header = convert_to_basic_auth(
+            TestingConfig.DEMO_USER_NAME, TestingConfig.DEMO_USER_PASS
+        )
+
+    def tearDown(self):
+        """
+        Clean up the database
+        """
+        flush_progress(self.app)
+        db.session.remove()
+        db.drop_all()
+        dispose_engines(self.app)
+        self.tmpdir.cleanup()
+
+    def handler(self, request):
+        """
+        A practice activity: a new question on create and next, the same question
+        completed on submit-answer
+        """
+        path = request.url.path
+        if path.endswith("/get-token") or path.endswith("/token"):
+            return httpx.Response(200, json={"token": "token"})
+        if path.endswith("/submit-answer"):
+            complete = True
+        else:
+            complete = False
+            self.response_ids.append(str(uuid.uuid4()))
+        body = json.dumps(
+            {
+                "activity": {"id": self.activity_id},
+                "response": {
+                    "id": self.response_ids[-1],
+                    "complete": complete,
+                    "template_id": 3,
+                },
+            }
+        ).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.stream:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        return httpx.Response(200, headers=headers, content=body)
+
+    def practise(self, path, **body):
+        response = self.client.post(
+            f"/siyavula/activity{path}",
+            json={"user_id": self.user_ids[0], **body},
+            headers={"Authorization": self.basic_auth_header},
+        )
+        response.get_data()
+        response.close()
+        self.assertEqual(response.status_code, 200)
+
+    def practise_activity(self):
+        """
+        Start an activity on section 7, answer its question and get the next one
+        """
+        self.practise("", section_id=7)
+        ids = {
+            "activity_uuid": self.activity_id,
+            "response_uuid": self.response_ids[-1],
+        }
+        self.practise("/answer", answers={"0": "42"}, **ids)
+        self.practise("/next", **ids)
+        flush_progress(self.app)
+
+    def test_practice_is_recorded(self):
+        """
+        Test every proxied practice response is recorded as an event
+        """
+        self.practise_activity()
+
+        events = PracticeEvent.query.order_by(PracticeEvent.id).all()
+
+        # Assertions
+        self.assertEqual([e.action for e in events], ["create", "answer", "next"])
+        self.assertEqual([e.section_id for e in events], [7, None, None])
+        self.assertEqual([e.complete for e in events], [False, True, False])
+        self.assertEqual({e.activity_id for e in events}, {self.activity_id})
+        self.assertEqual(events[0].response_id, events[1].response_id)
+
+    def test_user_progress(self):
+        """
+        Test a learner's progress is summarised in total and per section
+        """
+        self.practise_activity()
+
+        response = self.client.get(
+            f"/progress/users/{self.user_ids[0]}",
+            headers={"Authorization": self.basic_auth_header},
+        )
+        progress = response.get_json()
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {key: progress[key] for key in ("activities", "questions", "completed")},
+            {"activities": 1, "questions": 2, "completed": 1},
+        )
+        self.assertIsNotNone(progress["last_practised_at"])
+        self.assertEqual(len(progress["sections"]), 1)
+        self.assertEqual(progress["sections"][0]["section_id"], 7)
+        self.assertEqual(progress["sections"][0]["questions"], 2)
+
+    def test_course_progress(self):
+        """
+        Test a course lists the progress of every assigned learner
+        """
+        self.practise_activity()
+
+        response = self.client.get(
+            f"/progress/courses/{self.course_id}",
+            headers={"Authorization": self.basic_auth_header},
+        )
+        learners = response.get_json()["learners"]
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([learner["user_id"] for learner in learners], self.user_ids)
+        self.assertEqual(learners[0]["completed"], 1)
+        self.assertEqual(learners[1]["questions"], 0)
+        self.assertIsNone(learners[1]["last_practised_at"])
+
+    def test_progress_unknown_user(self):
+        """
+        Test progress of a user that does not exist is a 404
+        """
+        response = self.client.get(
+            "/progress/users/999", headers={"Authorization": self.basic_auth_header}
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 404)
+
+
+class TestStreamedProgress(TestProgress):
+    """
+    Run the same tests with Siyavula responses streamed through, gzip encoded
+    """
+
+    stream = True
+
+
+def convert_to_basic_auth(username, password):
+    token = b64encode(f"{username}:{password}".encode("utf-8")).decode("ascii")
+    return f"Basic {token}"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,188 @@
+import tempfile
+import time
+import unittest
+from base64 import b64encode
+
+import httpx
+
+from lms_backend.app import create_app, db
+from lms_backend.app.config import TestingConfig
+from lms_backend.app.db import dispose_engines
+from lms_backend.app.models import User
+from lms_backend.app.provisioning.services import stop_provisioning
+from lms_backend.app.siyavula import services
+
+USER_DATA = {
+    "email": "newuser@example.com",
+    "name": "New",
+    "surname": "User",
+    "password": "SecurePass123!",
+    "grade": "10",
+    "country": "ZA",
+    "curriculum": "CAPS",
+    "role": "Learner",
+}
+
+
+class TestProvisioning(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a test client, a file database shared with the worker threads and a
+        stubbed Siyavula API
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+        class ProvisioningTestingConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{self.tmpdir.name}/lms.db"
+            SIAVULA_PROVISIONING_ENABLED = True
+            SIAVULA_PROVISIONING_WORKERS = 2
+            SIAVULA_PROVISIONING_MAX_ATTEMPTS = 2
+            SIAVULA_PROVISIONING_RETRY_BACKOFF = 0.01
+            SIAVULA_PROVISIONING_POLL_INTERVAL = 0.05
+
+        self.app = create_app(ProvisioningTestingConfig)
+        self.client = self.app.test_client()
+        self.app.app_context().push()
+
+        self.account_status = 200
+        self.requests = []
+        self.app.extensions[services.HTTP_CLIENT_EXTENSION] = httpx.Client(
+            transport=httpx.MockTransport(self.handler)
+        )
+        services._siyavula_apis.clear()
+
+        self.basic_auth_header = convert_to_basic_auth(
+            TestingConfig.DEMO_USER_NAME, TestingConfig.DEMO_USER_PASS
+        )
+
+    def tearDown(self):
+        """
+        Stop the worker and clean up the database
+        """
+        stop_provisioning(self.app)
+        db.session.remove()
+        db.drop_all()
+        dispose_engines(self.app)
+        self.tmpdir.cleanup()
+
+    def handler(self, request):
+        self.requests.append(request)
+        path = request.url.path
+        if path.endswith("/get-token"):
+            return httpx.Response(200, json={"token": "client"})
+        if path.endswith("/token"):
+            return httpx.Response(200, json={"token": "user"})
+        return httpx.Response(self.account_status, json={"uuid": "new-account"})
+
+    def wait_for_job(self, user_id, statuses=("done", "failed")):
+        """
+        Polls the status endpoint until the user's job is finished
+        """
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            response = self.client.get(
+                f"/provisioning/{user_id}",
+                headers={"Authorization": self.basic_auth_header},
+            )
+            if (
+                response.status_code == 200
+                and response.get_json()["status"] in statuses
+            ):
+                return response.get_json()
+            time.sleep(0.02)
+        self.fail("Provisioning job did not finish")
+
+    def test_new_user_is_provisioned(self):
+        """
+        Test the Siyavula account of a created user is made in the background
+        """
+        response = self.client.post(
+            "/auth/users",
+            json=USER_DATA,
+            headers={"Authorization": self.basic_auth_header},
+        )
+        user_id = response.get_json()["id"]
+
+        job = self.wait_for_job(user_id)
+        summary = self.client.get(
+            "/provisioning", headers={"Authorization": self.basic_auth_header}
+        ).get_json()
+
+        # Assertions
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["attempts"], 1)
+        self.assertEqual(
+            db.session.get(User, user_id).siyavula_account_id, "new-account"
+        )
+        self.assertEqual(summary["done"], 1)
+        self.assertTrue(summary["enabled"])
+
+    def test_bulk_imported_users_are_provisioned(self):
+        """
+        Test every user of a bulk import gets a provisioning job
+        """
+        users = [{**USER_DATA, "email": f"learner{i}@example.com"} for i in range(3)]
+        response = self.client.post(
+            "/auth/users/bulk",
+            json=users,
+            headers={"Authorization": self.basic_auth_header},
+        )
+        user_ids = [result["id"] for result in response.get_json()["results"]]
+
+        jobs = [self.wait_for_job(user_id) for user_id in user_ids]
+
+        # Assertions
+        self.assertEqual([job["status"] for job in jobs], ["done"] * 3)
+        self.assertEqual(
+            len([r for r in self.requests if r.url.path.endswith("/user")]), 3
+        )
+
+    def test_failed_provisioning_is_retried(self):
+        """
+        Test a job is retried after a Siyavula error and failed after the last attempt
+        """
+        self.account_status = 500
+        response = self.client.post(
+            "/auth/users",
+            json=USER_DATA,
+            headers={"Authorization": self.basic_auth_header},
+        )
+        user_id = response.get_json()["id"]
+
+        job = self.wait_for_job(user_id)
+
+        # Assertions
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["attempts"], 2)
+        self.assertIn("status 500", job["last_error"])
+        self.assertIsNone(db.session.get(User, user_id).siyavula_account_id)
+
+    def test_provisioning_disabled(self):
+        """
+        Test no job is queued when provisioning is disabled
+        """
+        app = create_app(TestingConfig)
+        client = app.test_client()
+        with app.app_context():
+            response = client.post(
+                "/auth/users",
+                json=USER_DATA,
+                headers={"Authorization": self.basic_auth_header},
+            )
+            job = client.get(
+                f"/provisioning/{response.get_json()['id']}",
+                headers={"Authorization": self.basic_auth_header},
+            )
+
+        # Assertions
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(job.status_code, 404)
+
+
+def convert_to_basic_auth(username, password):
+    token = b64encode(f"{username}:{password}".encode("utf-8")).decode("ascii")
+    return f"Basic {token}"
+
+
+if __name__ == "__main__":
+    unittest.main()
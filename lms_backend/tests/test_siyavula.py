@@ -0,0 +1,795 @@
+import base64
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from base64 import b64encode
+
+import httpx
+from sqlalchemy import event
+
+from lms_backend.app import create_app, db
+from lms_backend.app.config import TestingConfig
+from lms_backend.app.db import dispose_engines
+from lms_backend.app.models import User
+from lms_backend.app.siyavula import services, toc, transport
+from lms_backend.app.siyavula.services import SiyavulaAPI, SiyavulaUserAPI
+
+
+def make_token(expires_in):
+    """
+    Build an unsigned JWT carrying an `exp` claim
+    """
+    payload = json.dumps({"exp": time.time() + expires_in}).encode("utf-8")
+    encoded = base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+    return f"header.{encoded}.signature"
+
+
+class ChunkedStream(httpx.SyncByteStream):
+    """
+    Response body that is only read when iterated, like a real network response
+    """
+
+    def __init__(self, body):
+        self.body = body
+        self.closed = False
+
+    def __iter__(self):
+        yield self.body
+
+    def close(self):
+        self.closed = True
+
+
+class StubSiyavula:
+    """
+    Stand-in for the Siyavula API, served through an httpx.MockTransport
+    """
+
+    def __init__(self):
+        self.client_tokens = []
+        self.activity_statuses = []
+        self.activity_errors = []
+        self.requests = []
+        self.streams = []
+        # Seconds the user token and account calls take
+        self.account_latency = 0
+        self.toc_statuses = []
+
+    def handler(self, request):
+        self.requests.append(request)
+        path = request.url.path
+        if path.endswith("/get-token"):
+            token = self.client_tokens.pop(0) if self.client_tokens else "client"
+            return httpx.Response(200, json={"token": token})
+        if path.endswith("/token") or path.endswith("/user"):
+            time.sleep(self.account_latency)
+        if path.endswith("/token"):
+            return httpx.Response(200, json={"token": "user"})
+        if path.endswith("/user"):
+            return httpx.Response(200, json={"uuid": "new-account"})
+        if "/toc/" in path:
+            return self.toc(request)
+        error = self.activity_errors.pop(0) if self.activity_errors else None
+        if error:
+            raise error(path, request=request)
+        status = self.activity_statuses.pop(0) if self.activity_statuses else 200
+        body = json.dumps({"path": path}).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Cache-Control": "no-store"}
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        headers["Content-Length"] = str(len(body))
+        stream = ChunkedStream(body)
+        self.streams.append(stream)
+        return httpx.Response(status, headers=headers, stream=stream)
+
+    def toc(self, request):
+        if self.toc_statuses:
+            return httpx.Response(self.toc_statuses.pop(0))
+        if request.url.path.endswith("/grade/12"):
+            return httpx.Response(404)
+        if request.headers.get("If-None-Match") == '"toc-v1"':
+            return httpx.Response(304, headers={"ETag": '"toc-v1"'})
+        return httpx.Response(
+            200,
+            json={"subject": "maths", "chapters": [{"sections": [{"id": 1}]}]},
+            headers={"ETag": '"toc-v1"'},
+        )
+
+    def client(self):
+        return httpx.Client(transport=httpx.MockTransport(self.handler))
+
+    def calls(self, suffix):
+        return [r for r in self.requests if r.url.path.endswith(suffix)]
+
+
+class TestSiyavulaClientToken(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a stubbed Siyavula API
+        """
+        self.stub = StubSiyavula()
+
+    def create_api(self, **kwargs):
+        return SiyavulaAPI(
+            "name", "pass", "ZA", "CAPS", client=self.stub.client(), **kwargs
+        )
+
+    def test_client_token_is_cached(self):
+        """
+        Test the client token is only fetched once while it is valid
+        """
+        token = make_token(3600)
+        self.stub.client_tokens = [token]
+
+        api = self.create_api()
+
+        self.assertEqual(api.client_token, token)
+        self.assertEqual(api.client_token, token)
+        self.assertEqual(len(self.stub.calls("/get-token")), 1)
+
+    def test_expired_client_token_is_refetched(self):
+        """
+        Test an expired client token is fetched again before use
+        """
+        self.stub.client_tokens = [make_token(-1), "fresh"]
+
+        api = self.create_api()
+
+        self.assertEqual(api.client_token, "fresh")
+        self.assertEqual(len(self.stub.calls("/get-token")), 2)
+
+    def test_client_token_refreshed_in_background(self):
+        """
+        Test a client token close to expiry is still returned while it is refreshed
+        """
+        stale = make_token(30)
+        self.stub.client_tokens = [stale, "fresh"]
+
+        api = self.create_api(refresh_margin=60)
+
+        self.assertEqual(api.client_token, stale)
+        for _ in range(100):
+            if len(self.stub.calls("/get-token")) == 2 and not api._refreshing:
+                break
+            time.sleep(0.01)
+        self.assertEqual(api.client_token, "fresh")
+
+    def test_invalidated_client_token_is_refetched(self):
+        """
+        Test a client token rejected by Siyavula is fetched again
+        """
+        self.stub.client_tokens = ["old", "new"]
+
+        api = self.create_api()
+        api.invalidate_client_token()
+
+        self.assertEqual(api.client_token, "new")
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_consecutive_failures(self):
+        """
+        Test the circuit opens after the failure threshold and fails calls fast
+        """
+        breaker = services.CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+
+        # Assertions
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(services.SiyavulaUnavailable) as raised:
+            breaker.before_call()
+        self.assertGreater(raised.exception.retry_after, 29)
+
+    def test_trial_call_after_reset_timeout(self):
+        """
+        Test a single trial call is let through after the reset timeout
+        """
+        breaker = services.CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+
+        # Assertions
+        self.assertEqual(breaker.state, "half-open")
+        breaker.before_call()
+        with self.assertRaises(services.SiyavulaUnavailable):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_failed_trial_call_reopens_circuit(self):
+        """
+        Test a trial call failing with an error other than a transport error opens the
+        circuit again, for another reset timeout only
+        """
+        stub = StubSiyavula()
+        breaker = services.CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        api = SiyavulaAPI(
+            "name", "pass", "ZA", "CAPS", client=stub.client(), breaker=breaker
+        )
+        breaker.record_failure()
+        time.sleep(0.02)
+        stub.activity_errors = [httpx.DecodingError]
+
+        # Assertions
+        with self.assertRaises(services.SiyavulaUnavailable):
+            api.send("GET", f"{api.base_url}/activity/create/practice/1")
+        self.assertEqual(breaker.state, "open")
+        time.sleep(0.02)
+        self.assertEqual(breaker.state, "half-open")
+        self.assertEqual(api.send("GET", f"{api.base_url}/toc").status_code, 200)
+        self.assertEqual(breaker.state, "closed")
+
+
+class TestSiyavulaAccountCreation(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a file database shared by threads, a learner without a Siyavula account
+        and a slow stubbed Siyavula API
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+        class FileTestingConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{self.tmpdir.name}/lms.db"
+
+        self.app = create_app(FileTestingConfig)
+        self.app.app_context().push()
+
+        self.stub = StubSiyavula()
+        self.stub.account_latency = 0.1
+        user = User(
+            email="learner@example.com",
+            name="Learner",
+            surname="User",
+            password_hash="wololo",
+            grade="10",
+            country="ZA",
+            curriculum="CAPS",
+            role="Learner",
+        )
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+
+    def tearDown(self):
+        """
+        Clean up the database
+        """
+        db.session.remove()
+        db.drop_all()
+        dispose_engines(self.app)
+        self.tmpdir.cleanup()
+
+    def create_api(self):
+        return SiyavulaAPI("name", "pass", "ZA", "CAPS", client=self.stub.client())
+
+    def get_tokens(self, apis):
+        """
+        Gets the learner's user token from one thread per API client
+        """
+        tokens = []
+
+        def get_token(api):
+            with self.app.app_context():
+                user_api = SiyavulaUserAPI(api=api, user_id=self.user_id)
+                user_api.get_or_create_user_token()
+                tokens.append(user_api.user_token)
+                db.session.remove()
+
+        threads = [threading.Thread(target=get_token, args=(api,)) for api in apis]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return tokens
+
+    def test_concurrent_requests_share_one_call(self):
+        """
+        Test concurrent requests for a learner create one account and fetch one token
+        """
+        api = self.create_api()
+
+        tokens = self.get_tokens([api] * 5)
+
+        # Assertions
+        self.assertEqual(tokens, ["user"] * 5)
+        self.assertEqual(len(self.stub.calls("/user")), 1)
+        self.assertEqual(len(self.stub.calls("/token")), 1)
+        self.assertEqual(
+            db.session.get(User, self.user_id).siyavula_account_id, "new-account"
+        )
+
+    def test_concurrent_workers_create_one_account(self):
+        """
+        Test API clients that share nothing but the database create one account
+        """
+        tokens = self.get_tokens([self.create_api() for _ in range(3)])
+
+        # Assertions
+        self.assertEqual(tokens, ["user"] * 3)
+        self.assertEqual(len(self.stub.calls("/user")), 1)
+        self.assertEqual(
+            db.session.get(User, self.user_id).siyavula_account_id, "new-account"
+        )
+
+    def test_stale_claim_is_taken_over(self):
+        """
+        Test an account creation that another worker abandoned is retried
+        """
+        user = db.session.get(User, self.user_id)
+        user.siyavula_account_id = (
+            f"{services.PENDING_ACCOUNT_PREFIX}{int(time.time()) - 60}:dead"
+        )
+        db.session.commit()
+
+        user_api = SiyavulaUserAPI(api=self.create_api(), user_id=self.user_id)
+        user_api.get_or_create_user_token()
+
+        # Assertions
+        self.assertEqual(len(self.stub.calls("/user")), 1)
+        self.assertEqual(
+            db.session.get(User, self.user_id).siyavula_account_id, "new-account"
+        )
+
+    def test_waiting_worker_only_reads(self):
+        """
+        Test a worker waiting for another worker's account creation polls without
+        writing, and uses the account once it is created
+        """
+        user = db.session.get(User, self.user_id)
+        user.siyavula_account_id = (
+            f"{services.PENDING_ACCOUNT_PREFIX}{int(time.time())}:busy"
+        )
+        db.session.commit()
+        statements = []
+        waiter = threading.current_thread()
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if threading.current_thread() is waiter:
+                statements.append(statement.split()[0].upper())
+
+        def create_account():
+            time.sleep(0.3)
+            with self.app.app_context():
+                other = db.session.get(User, self.user_id)
+                other.siyavula_account_id = "other-account"
+                db.session.commit()
+                db.session.remove()
+
+        user_api = SiyavulaUserAPI(api=self.create_api(), user_id=self.user_id)
+        thread = threading.Thread(target=create_account)
+        thread.start()
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            user_api.create_siavula_user_id()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        thread.join()
+
+        # Assertions
+        self.assertEqual(user_api.user.siyavula_account_id, "other-account")
+        self.assertEqual(len(self.stub.calls("/user")), 0)
+        self.assertGreater(statements.count("SELECT"), 1)
+        self.assertNotIn("UPDATE", statements)
+
+
+class TestSiyavulaToc(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a stubbed Siyavula API and a cache directory
+        """
+        self.stub = StubSiyavula()
+        self.api = SiyavulaAPI("name", "pass", "ZA", "CAPS", client=self.stub.client())
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_expired_toc_is_revalidated(self):
+        """
+        Test an expired table of contents is revalidated with its ETag and kept on a 304
+        """
+        cache = toc.TocCache(ttl=0, directory=self.tmpdir.name)
+        fetched = cache.get(self.api, "maths", 10)
+        revalidated = cache.get(self.api, "maths", 10)
+
+        requests = self.stub.calls("/toc/subject/maths/grade/10")
+
+        # Assertions
+        self.assertEqual(revalidated.body, fetched.body)
+        self.assertEqual(revalidated.etag, fetched.etag)
+        self.assertEqual(len(requests), 2)
+        self.assertNotIn("If-None-Match", requests[0].headers)
+        self.assertEqual(requests[1].headers["If-None-Match"], '"toc-v1"')
+
+    def test_toc_is_loaded_from_disk(self):
+        """
+        Test a table of contents stored by another process is used without Siyavula
+        """
+        toc.TocCache(directory=self.tmpdir.name).get(self.api, "maths", 10)
+        entry = toc.TocCache(directory=self.tmpdir.name).get(self.api, "maths", 10)
+
+        # Assertions
+        self.assertEqual(len(self.stub.calls("/grade/10")), 1)
+        self.assertEqual(json.loads(entry.body)["subject"], "maths")
+
+    def test_stale_toc_served_when_unavailable(self):
+        """
+        Test the cached table of contents is served while Siyavula fails
+        """
+        cache = toc.TocCache(ttl=0, directory=self.tmpdir.name)
+        fetched = cache.get(self.api, "maths", 10)
+        self.stub.toc_statuses = [500]
+
+        # Assertions
+        self.assertEqual(cache.get(self.api, "maths", 10).body, fetched.body)
+        with self.assertRaises(services.SiyavulaUnavailable):
+            self.stub.toc_statuses = [500]
+            toc.TocCache().get(self.api, "maths", 10)
+
+
+class TestSiyavulaRecordReplay(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a stubbed Siyavula API on a custom base URL and a cassette file
+        """
+        self.stub = StubSiyavula()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cassette = os.path.join(self.tmpdir.name, "cassette.jsonl")
+        self.base_url = "http://siyavula.local/api/siyavula/v1"
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_recorded_exchanges_are_replayed(self):
+        """
+        Test exchanges recorded from Siyavula are served back without it
+        """
+        recording = transport.RecordingTransport(
+            httpx.MockTransport(self.stub.handler), transport.Cassette(self.cassette)
+        )
+        api = SiyavulaAPI(
+            "name",
+            "pass",
+            "ZA",
+            "CAPS",
+            client=httpx.Client(transport=recording),
+            base_url=self.base_url,
+        )
+        recorded = api.http_client.get(f"{self.base_url}/user/1/token").json()
+
+        replay = transport.ReplayTransport(
+            transport.Cassette(self.cassette).load(), speed=0
+        )
+        client = httpx.Client(transport=replay)
+        replayed_api = SiyavulaAPI(
+            "name", "pass", "ZA", "CAPS", client=client, base_url=self.base_url
+        )
+
+        # Assertions
+        self.assertEqual(
+            [str(r.url) for r in self.stub.requests],
+            [f"{self.base_url}/get-token", f"{self.base_url}/user/1/token"],
+        )
+        self.assertEqual(replayed_api.client_token, api.client_token)
+        # Another user's token request is served by the recorded one of the same operation
+        self.assertEqual(client.get(f"{self.base_url}/user/2/token").json(), recorded)
+        with self.assertRaises(httpx.ConnectError):
+            client.get(f"{self.base_url}/activity/create/practice/1")
+
+
+class TestSiyavulaBlueprint(unittest.TestCase):
+    config = TestingConfig
+
+    def setUp(self):
+        """
+        Set up a test client, in-memory database and stubbed Siyavula API
+        """
+        self.app = create_app(self.config)
+        self.client = self.app.test_client()
+        self.app.app_context().push()
+
+        self.stub = StubSiyavula()
+        self.app.extensions[services.HTTP_CLIENT_EXTENSION] = self.stub.client()
+        services._siyavula_apis.clear()
+
+        user = User(
+            email="learner@example.com",
+            name="Learner",
+            surname="User",
+            password_hash="wololo",
+            grade="10",
+            country="ZA",
+            curriculum="CAPS",
+            role="Learner",
+            siyavula_account_id="existing-account",
+        )
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+
+        self.basic_auth_header = convert_to_basic_auth(
+            TestingConfig.DEMO_USER_NAME, TestingConfig.DEMO_USER_PASS
+        )
+
+    def tearDown(self):
+        """
+        Clean up the database
+        """
+        db.session.remove()
+        db.drop_all()
+
+    def test_create_activity(self):
+        """
+        Test creating a practice activity is proxied to Siyavula
+        """
+        response = self.client.post(
+            "/siyavula/activity",
+            json={"section_id": 1, "user_id": self.user_id},
+            headers={"Authorization": self.basic_auth_header},
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.get_json(),
+            {"path": "/api/siyavula/v1/activity/create/practice/1"},
+        )
+
+    def test_user_token_is_reused(self):
+        """
+        Test the client and user tokens are only fetched once across practice calls
+        """
+        for _ in range(3):
+            response = self.client.post(
+                "/siyavula/activity",
+                json={"section_id": 1, "user_id": self.user_id},
+                headers={"Authorization": self.basic_auth_header},
+            )
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(self.stub.calls("/get-token")), 1)
+        self.assertEqual(len(self.stub.calls("/token")), 1)
+
+    def test_rejected_user_token_is_refetched(self):
+        """
+        Test a 401 drops the cached tokens and the call is retried once
+        """
+        api = services.get_siyavula_api("name", "pass", "ZA", "CAPS")
+        user_api = SiyavulaUserAPI(api=api, user_id=self.user_id)
+        user_api.create_practice_activity(section_id=1)
+
+        self.stub.activity_statuses = [401]
+        response = user_api.create_practice_activity(section_id=1)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.stub.calls("/get-token")), 2)
+        self.assertEqual(len(self.stub.calls("/token")), 2)
+
+    def test_unsent_request_is_retried(self):
+        """
+        Test a request that could not reach Siyavula is retried
+        """
+        self.stub.activity_errors = [httpx.ConnectError]
+        response = self.client.post(
+            "/siyavula/activity",
+            json={"section_id": 1, "user_id": self.user_id},
+            headers={"Authorization": self.basic_auth_header},
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.stub.calls("/practice/1")), 2)
+
+    def test_state_changing_get_is_not_retried(self):
+        """
+        Test creating an activity is sent once after a 503 or a read timeout, as Siyavula
+        may have created it
+        """
+        self.stub.activity_statuses = [503]
+        self.stub.activity_errors = [None, httpx.ReadTimeout]
+        responses = []
+        for _ in range(2):
+            responses.append(
+                self.client.post(
+                    "/siyavula/activity",
+                    json={"section_id": 1, "user_id": self.user_id},
+                    headers={"Authorization": self.basic_auth_header},
+                )
+            )
+
+        # Assertions
+        self.assertEqual([r.status_code for r in responses], [503, 503])
+        self.assertEqual(len(self.stub.calls("/practice/1")), 2)
+
+    def test_read_only_get_is_retried(self):
+        """
+        Test a table of contents request is retried after a 503
+        """
+        self.stub.toc_statuses = [503]
+        response = self.client.get(
+            "/siyavula/toc?grade=10", headers={"Authorization": self.basic_auth_header}
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.stub.calls("/grade/10")), 2)
+
+    def test_failed_post_is_not_retried(self):
+        """
+        Test a POST to Siyavula is sent once, even if it failed
+        """
+        self.stub.activity_statuses = [503]
+        response = self.client.post(
+            "/siyavula/activity/answer",
+            json={
+                "user_id": self.user_id,
+                "activity_uuid": str(uuid.uuid4()),
+                "response_uuid": str(uuid.uuid4()),
+                "answers": {},
+            },
+            headers={"Authorization": self.basic_auth_header},
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.stub.calls("/submit-answer")), 1)
+
+    def test_unavailable_siyavula_fails_fast(self):
+        """
+        Test repeated Siyavula failures open the circuit, after which calls get a 503
+        without reaching Siyavula
+        """
+        self.stub.activity_errors = [httpx.ConnectError] * 5
+        for _ in range(2):
+            response = self.client.post(
+                "/siyavula/activity",
+                json={"section_id": 1, "user_id": self.user_id},
+                headers={"Authorization": self.basic_auth_header},
+            )
+            self.assertEqual(response.status_code, 503)
+        calls = len(self.stub.requests)
+
+        response = self.client.post(
+            "/siyavula/activity",
+            json={"section_id": 1, "user_id": self.user_id},
+            headers={"Authorization": self.basic_auth_header},
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response.headers)
+        self.assertEqual(len(self.stub.requests), calls)
+
+    def test_toc_is_cached(self):
+        """
+        Test the table of contents is fetched once and served with an ETag
+        """
+        responses = [
+            self.client.get(
+                "/siyavula/toc?grade=10",
+                headers={"Authorization": self.basic_auth_header},
+            )
+            for _ in range(2)
+        ]
+        etag = responses[0].headers["ETag"]
+        not_modified = self.client.get(
+            "/siyavula/toc?grade=10",
+            headers={"Authorization": self.basic_auth_header, "If-None-Match": etag},
+        )
+        missing = self.client.get(
+            "/siyavula/toc?grade=12", headers={"Authorization": self.basic_auth_header}
+        )
+
+        # Assertions
+        self.assertEqual([r.status_code for r in responses], [200, 200])
+        self.assertEqual(responses[1].get_json()["subject"], "maths")
+        self.assertEqual(len(self.stub.calls("/toc/subject/maths/grade/10")), 1)
+        self.assertIn("max-age=", responses[0].headers["Cache-Control"])
+        self.assertIn("private", responses[0].headers["Cache-Control"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(missing.status_code, 404)
+
+    def test_toc_curricula_are_allow_listed(self):
+        """
+        Test only the configured region and curriculum pairs can be requested, so a
+        client cannot make us keep a Siyavula API client per made-up pair
+        """
+        self.app.config["SIAVULA_EXTRA_CURRICULA"] = "NG:WAEC"
+        headers = {"Authorization": self.basic_auth_header}
+        apis = len(services._siyavula_apis)
+        unsupported = [
+            self.client.get(f"/siyavula/toc?grade=10&{query}", headers=headers)
+            for query in ("region=XX", "curriculum=WAEC", "region=NG&curriculum=CAPS")
+        ]
+        unsupported_apis = len(services._siyavula_apis)
+        supported = self.client.get(
+            "/siyavula/toc?grade=10&region=NG&curriculum=WAEC", headers=headers
+        )
+
+        # Assertions
+        self.assertEqual([r.status_code for r in unsupported], [400, 400, 400])
+        self.assertEqual(unsupported_apis, apis)
+        self.assertEqual(supported.status_code, 200)
+        self.assertIn(("NG", "WAEC"), [key[1:] for key in services._siyavula_apis])
+
+    def test_released_http_client_is_recreated(self):
+        """
+        Test that releasing the HTTP clients, as on worker shutdown, closes them and
+        that the next use creates a new client
+        """
+        client = services.get_http_client()
+        services.release_http_clients(self.app)
+        new_client = services.get_http_client()
+
+        # Assertions
+        self.assertTrue(client.is_closed)
+        self.assertIsNot(new_client, client)
+        self.assertFalse(new_client.is_closed)
+        new_client.close()
+
+
+class StreamingTestingConfig(TestingConfig):
+    SIAVULA_STREAM_RESPONSES = True
+
+
+class TestSiyavulaStreamingBlueprint(TestSiyavulaBlueprint):
+    config = StreamingTestingConfig
+
+    def test_streamed_response_headers(self):
+        """
+        Test a streamed response keeps the upstream headers and releases the connection
+        """
+        response = self.client.post(
+            "/siyavula/activity",
+            json={"section_id": 1, "user_id": self.user_id},
+            headers={"Authorization": self.basic_auth_header},
+        )
+
+        # Assertions
+        body = response.get_data()
+        response.close()
+        self.assertEqual(response.headers["Content-Length"], str(len(body)))
+        self.assertEqual(response.headers["Cache-Control"], "no-store")
+        self.assertEqual(
+            json.loads(body), {"path": "/api/siyavula/v1/activity/create/practice/1"}
+        )
+        self.assertTrue(self.stub.streams[-1].closed)
+        self.assertEqual(self.stub.requests[-1].headers["Accept-Encoding"], "identity")
+
+    def test_streamed_response_encoding(self):
+        """
+        Test a streamed response is only compressed by Siyavula if our client accepts it,
+        as it is passed on still encoded
+        """
+        response = self.client.post(
+            "/siyavula/activity",
+            json={"section_id": 1, "user_id": self.user_id},
+            headers={
+                "Authorization": self.basic_auth_header,
+                "Accept-Encoding": "gzip",
+            },
+        )
+
+        # Assertions
+        body = response.get_data()
+        response.close()
+        self.assertEqual(self.stub.requests[-1].headers["Accept-Encoding"], "gzip")
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.headers["Content-Length"], str(len(body)))
+        self.assertEqual(
+            json.loads(gzip.decompress(body)),
+            {"path": "/api/siyavula/v1/activity/create/practice/1"},
+        )
+
+
+def convert_to_basic_auth(username, password):
+    token = b64encode(f"{username}:{password}".encode("utf-8")).decode("ascii")
+    return f"Basic {token}"
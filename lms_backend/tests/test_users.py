@@ -1,9 +1,15 @@
 from base64 import b64encode
+from datetime import timedelta
 import unittest
-from lms_backend.app.config import TestingConfig
+from unittest import mock
+from itsdangerous import URLSafeTimedSerializer
+from lms_backend.app.config import DEFAULT_SECRET_KEY, TestingConfig
 from lms_backend.app.models import User
+from lms_backend.app.users.services import hash_passwords
+from lms_backend.app.utils import utcnow
 from lms_backend.app import create_app, db
-from werkzeug.security import generate_password_hash
+from werkzeug.http import http_date
+from werkzeug.security import check_password_hash, generate_password_hash
 
 
 class TestAuthBlueprint(unittest.TestCase):
@@ -128,6 +134,300 @@ class TestAuthBlueprint(unittest.TestCase):
         self.assertEqual(users[1]["email"], "existing@example.com")
         self.assertEqual(users[1]["name"], "Existing")
 
+    def test_get_users_paginated(self):
+        """
+        Test paging through users with a cursor
+        """
+        response = self.client.get(
+            "/auth/users?limit=1",
+            headers={
+                "Authorization": self.basic_auth_header,
+            },
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()), 1)
+        self.assertEqual(response.headers["X-Next-Cursor"], "1")
+        next_url = response.headers["Link"].split(">")[0].lstrip("<")
+
+        response = self.client.get(
+            next_url,
+            headers={
+                "Authorization": self.basic_auth_header,
+            },
+        )
+        users = response.get_json()
+        self.assertEqual(len(users), 1)
+        self.assertEqual(users[0]["email"], "existing@example.com")
+        self.assertNotIn("Link", response.headers)
+
+    def test_get_users_unpaginated_by_default(self):
+        """
+        Test all users are returned without `limit` or `after`, and pages of the default
+        size with only `after`
+        """
+        headers = {"Authorization": self.basic_auth_header}
+        with mock.patch("lms_backend.app.users.routes.USERS_PAGE_SIZE", 1):
+            everyone = self.client.get("/auth/users", headers=headers)
+            page = self.client.get("/auth/users?after=0", headers=headers)
+
+        # Assertions
+        self.assertEqual(len(everyone.get_json()), 2)
+        self.assertNotIn("Link", everyone.headers)
+        self.assertEqual(len(page.get_json()), 1)
+        self.assertIn("limit=1", page.headers["Link"])
+
+    def test_get_users_filtered(self):
+        """
+        Test filtering users by role
+        """
+        response = self.client.get(
+            "/auth/users?role=Learner",
+            headers={
+                "Authorization": self.basic_auth_header,
+            },
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        users = response.get_json()
+        self.assertEqual(len(users), 1)
+        self.assertEqual(users[0]["role"], "Learner")
+
+    def test_create_users_bulk(self):
+        """
+        Test importing users from JSON, with a result per row
+        """
+        user_data = {
+            "name": "New",
+            "surname": "User",
+            "password": "SecurePass123!",
+            "grade": "10",
+            "country": "ZA",
+            "curriculum": "CAPS",
+            "role": "Learner",
+        }
+        users = [
+            {**user_data, "email": "first@example.com"},
+            {**user_data, "email": "existing@example.com"},
+            {**user_data, "email": "first@example.com"},
+            {**user_data, "email": "second@example.com", "grade": "ten"},
+        ]
+
+        response = self.client.post(
+            "/auth/users/bulk",
+            json=users,
+            headers={
+                "Authorization": self.basic_auth_header,
+            },
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(report["failed"], 3)
+        statuses = [result["status"] for result in report["results"]]
+        self.assertEqual(statuses, ["created", "conflict", "conflict", "invalid"])
+
+        user_in_db = User.query.filter_by(email="first@example.com").first()
+        self.assertEqual(report["results"][0]["id"], user_in_db.id)
+        self.assertTrue(check_password_hash(user_in_db.password_hash, "SecurePass123!"))
+
+    def test_create_users_bulk_csv(self):
+        """
+        Test importing users from a CSV file
+        """
+        data = (
+            "email,name,surname,password,grade,country,curriculum,role\n"
+            "csv1@example.com,One,User,pass1,10,ZA,CAPS,Learner\n"
+            "csv2@example.com,Two,User,pass2,11,ZA,CAPS,Learner\n"
+        )
+
+        response = self.client.post(
+            "/auth/users/bulk",
+            data=data,
+            content_type="text/csv",
+            headers={
+                "Authorization": self.basic_auth_header,
+            },
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["created"], 2)
+        self.assertEqual(User.query.filter(User.email.like("csv%")).count(), 2)
+
+    def test_hash_passwords_in_threads(self):
+        """
+        Test passwords hashed on several threads come back in input order
+        """
+        passwords = [f"password-{i}" for i in range(4)]
+        hashes = hash_passwords(passwords, workers=2)
+
+        # Assertions
+        self.assertEqual(len(hashes), 4)
+        for password, password_hash in zip(passwords, hashes):
+            self.assertTrue(check_password_hash(password_hash, password))
+
+    def test_create_token(self):
+        """
+        Test exchanging Basic credentials for a bearer token that grants access
+        """
+        response = self.client.post(
+            "/auth/token",
+            headers={
+                "Authorization": self.basic_auth_header,
+            },
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        token = response.get_json()["token"]
+
+        response = self.client.get(
+            "/auth/users",
+            headers={
+                "Authorization": f"Bearer {token}",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()), 2)
+
+    def test_default_secret_key_disables_tokens(self):
+        """
+        Test bearer tokens are neither issued nor accepted outside tests while SECRET_KEY
+        is the public default, as anyone could sign them
+        """
+        self.app.config["TESTING"] = False
+        self.app.config["SECRET_KEY"] = DEFAULT_SECRET_KEY
+        forged = URLSafeTimedSerializer(DEFAULT_SECRET_KEY, salt="auth-token").dumps(
+            {"id": 999, "email": "nobody@example.com", "role": "Teacher"}
+        )
+
+        issued = self.client.post(
+            "/auth/token", headers={"Authorization": self.basic_auth_header}
+        )
+        accepted = self.client.get(
+            "/auth/users", headers={"Authorization": f"Bearer {forged}"}
+        )
+
+        # Assertions
+        self.assertEqual(issued.status_code, 503)
+        self.assertEqual(accepted.status_code, 401)
+
+    def test_invalid_token(self):
+        """
+        Test a tampered bearer token is rejected
+        """
+        response = self.client.get(
+            "/auth/users",
+            headers={
+                "Authorization": "Bearer not-a-valid-token",
+            },
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 401)
+
+    def test_verified_credentials_are_cached(self):
+        """
+        Test repeat Basic auth requests skip the password hash check
+        until the password changes
+        """
+        headers = {
+            "Authorization": convert_to_basic_auth(
+                "existing@example.com", "password123"
+            )
+        }
+        with mock.patch(
+            "lms_backend.app.auth.check_password_hash", wraps=check_password_hash
+        ) as check:
+            for _ in range(3):
+                response = self.client.get("/auth/users", headers=headers)
+                self.assertEqual(response.status_code, 200)
+            self.assertEqual(check.call_count, 1)
+
+            # Changing the password drops the cached credentials
+            user = User.query.filter_by(email="existing@example.com").first()
+            user.password_hash = generate_password_hash("new-password")
+            db.session.commit()
+
+            response = self.client.get("/auth/users", headers=headers)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(check.call_count, 2)
+
+    def test_get_users_not_modified(self):
+        """
+        Test listing users answers a 304 while no user changed, and a 200 after one is created
+        """
+        headers = {"Authorization": self.basic_auth_header}
+        # Last-Modified is only sent once the second of the last change has passed
+        later = utcnow() + timedelta(seconds=2)
+        with mock.patch("lms_backend.app.versioning.utcnow", return_value=later):
+            response = self.client.get("/auth/users", headers=headers)
+            not_modified_since = self.client.get(
+                "/auth/users",
+                headers={
+                    **headers,
+                    "If-Modified-Since": response.headers["Last-Modified"],
+                },
+            )
+        etag = response.headers["ETag"]
+
+        not_modified = self.client.get(
+            "/auth/users", headers={**headers, "If-None-Match": etag}
+        )
+        self.client.post(
+            "/auth/users",
+            json={
+                "email": "newuser@example.com",
+                "name": "New",
+                "surname": "User",
+                "password": "SecurePass123!",
+                "grade": "10",
+                "country": "ZA",
+                "curriculum": "CAPS",
+                "role": "Learner",
+            },
+            headers=headers,
+        )
+        modified = self.client.get(
+            "/auth/users", headers={**headers, "If-None-Match": etag}
+        )
+
+        # Assertions
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response.headers["Cache-Control"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.get_data(), b"")
+        self.assertEqual(not_modified.headers["ETag"], etag)
+        self.assertEqual(not_modified_since.status_code, 304)
+        self.assertEqual(modified.status_code, 200)
+        self.assertNotEqual(modified.headers["ETag"], etag)
+        self.assertEqual(len(modified.get_json()), 3)
+
+    def test_get_users_modified_in_same_second(self):
+        """
+        Test a change in the current second is not hidden by If-Modified-Since, which has
+        a resolution of one second
+        """
+        headers = {"Authorization": self.basic_auth_header}
+        now = utcnow().replace(microsecond=500000)
+        with mock.patch("lms_backend.app.versioning.utcnow", return_value=now):
+            user = User.query.filter_by(email="existing@example.com").first()
+            user.name = "Changed"
+            db.session.commit()
+            modified = self.client.get(
+                "/auth/users", headers={**headers, "If-Modified-Since": http_date(now)}
+            )
+
+        # Assertions
+        self.assertEqual(modified.status_code, 200)
+        self.assertNotIn("Last-Modified", modified.headers)
+        self.assertIn("Changed", [user["name"] for user in modified.get_json()])
+
 
 def convert_to_basic_auth(username, password):
     token = b64encode(f"{username}:{password}".encode("utf-8")).decode("ascii")